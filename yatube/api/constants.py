@@ -0,0 +1,10 @@
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
+FIELDS_PARAM = 'fields'
+LIMIT_PARAM = 'limit'
+# Заголовок Authorization: Token <ключ>.
+TOKEN_SCHEME = 'Token'
+FORM_CONTENT_TYPES = (
+    'application/x-www-form-urlencoded',
+    'multipart/form-data',
+)
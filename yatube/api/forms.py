@@ -0,0 +1,14 @@
+from django import forms
+
+from posts.forms import PostForm
+from posts.models import Group
+
+
+class PostApiForm(PostForm):
+    '''PostForm, где группа задаётся slug, как в ответах API'''
+
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+    )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Token
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выпускает токен API для пользователя; прежний токен перестаёт '
+        'действовать'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Владелец токена')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        self.stdout.write(Token.issue(user))
@@ -0,0 +1,43 @@
+import hashlib
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class Token(models.Model):
+    '''Токен API; в базе хранится только его SHA-256'''
+
+    digest = models.CharField('SHA-256 токена', max_length=64, unique=True)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='пользователь',
+        related_name='api_token',
+    )
+    created = models.DateTimeField('дата выпуска', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'токен API'
+        verbose_name_plural = 'токены API'
+
+    def __str__(self) -> str:
+        return f'Токен {self.user_id}'
+
+    @classmethod
+    def issue(cls, user):
+        '''Выпускает новый токен вместо прежнего и возвращает его'''
+
+        key = secrets.token_hex(20)
+        cls.objects.update_or_create(
+            user=user,
+            defaults={'digest': token_digest(key)},
+        )
+
+        return key
@@ -0,0 +1,91 @@
+from django.core.files.storage import default_storage
+
+from .constants import FIELDS_PARAM
+from .utils import ApiError
+
+# Публичное имя поля -> выражение для values(). Связи отдаются
+# естественными ключами, поэтому список строится одним запросом
+# без создания моделей.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+GROUP_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+    'posts_count': 'posts_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+FOLLOW_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+}
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+CONVERTERS = {
+    'image': media_url,
+}
+
+
+def selected_fields(request, fields):
+    '''Поля из ?fields=a,b; без параметра — все поля ресурса'''
+
+    raw = request.GET.get(FIELDS_PARAM)
+    if not raw:
+        return list(fields)
+    selected = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in selected if name not in fields]
+    if unknown:
+        raise ApiError({
+            FIELDS_PARAM: [f'Неизвестные поля: {", ".join(unknown)}'],
+        })
+
+    return selected
+
+
+class Projection:
+    '''Выбранные поля ресурса поверх values().
+
+    Ключ курсора и id всегда попадают в выборку, но в ответе
+    остаются только запрошенные поля.
+    '''
+
+    def __init__(self, fields, selected, key='id'):
+        self.fields = fields
+        self.selected = selected
+        lookups = {'id', key, *(fields[name] for name in selected)}
+        self.lookups = sorted(lookups)
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def row(self, values):
+        row = {}
+        for name in self.selected:
+            value = values[self.fields[name]]
+            if name in CONVERTERS:
+                value = CONVERTERS[name](value)
+            row[name] = value
+
+        return row
+
+    def rows(self, objects):
+        return [self.row(values) for values in objects]
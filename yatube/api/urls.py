@@ -0,0 +1,29 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/', views.post, name='post'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comments,
+        name='comments',
+    ),
+    path('groups/', views.groups, name='groups'),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.group_posts,
+        name='group_posts',
+    ),
+    path(
+        'users/<str:username>/posts/',
+        views.user_posts,
+        name='user_posts',
+    ),
+    path('follows/', views.follows, name='follows'),
+    path('follows/<str:username>/', views.follow, name='follow'),
+]
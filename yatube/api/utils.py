@@ -0,0 +1,212 @@
+from functools import wraps
+import hashlib
+import json
+
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, QueryDict
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+
+from core.middleware import SAFE_METHODS
+from posts.constants import CURSOR_PARAM
+from posts.utils import CursorPaginator, encode_cursor
+
+from .constants import (
+    API_MAX_PAGE_SIZE,
+    API_PAGE_SIZE,
+    FORM_CONTENT_TYPES,
+    LIMIT_PARAM,
+    TOKEN_SCHEME,
+)
+from .models import Token, token_digest
+
+
+class ApiError(Exception):
+    '''Ошибка, которая уходит клиенту JSON-ответом'''
+
+    def __init__(self, errors, status=400):
+        super().__init__(errors)
+        self.errors = errors
+        self.status = status
+
+
+def json_response(request, data, status=200):
+    '''JSON-ответ; успешный GET получает ETag и 304 на If-None-Match'''
+
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    response = HttpResponse(
+        body,
+        content_type='application/json',
+        status=status,
+    )
+    if request.method in ('GET', 'HEAD') and status == 200:
+        etag = quote_etag(hashlib.md5(body.encode()).hexdigest())
+        response['ETag'] = etag
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            response=response,
+        )
+        if not_modified is not None:
+            return not_modified
+
+    return response
+
+
+def no_content():
+    return HttpResponse(status=204)
+
+
+def request_data(request):
+    '''Данные из JSON-тела или формы и файлы; другое тело — 415'''
+
+    if request.content_type in FORM_CONTENT_TYPES:
+        if request.method == 'POST':
+            return request.POST, request.FILES
+        # Django разбирает тело формы только у POST.
+        if request.content_type == 'multipart/form-data':
+            return request.parse_file_upload(request.META, request)
+        return QueryDict(request.body, encoding=request.encoding), None
+    if request.content_type != 'application/json':
+        raise ApiError(
+            {'detail': 'Тело должно быть JSON или формой'},
+            status=415,
+        )
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError({'detail': 'Некорректный JSON'})
+    if not isinstance(data, dict):
+        raise ApiError({'detail': 'Ожидался JSON-объект'})
+
+    return data, None
+
+
+def authenticate(request):
+    '''Пользователь по заголовку Authorization: Token <ключ>.
+
+    Без заголовка остаётся вход по сессии, и небезопасные методы
+    проверяют CSRF-токен, как формы сайта. Клиенту с токеном
+    CSRF не нужен: чужая страница не может подставить заголовок.
+    '''
+
+    scheme, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme != TOKEN_SCHEME:
+        if (
+            request.method in SAFE_METHODS
+            or not request.user.is_authenticated
+        ):
+            return
+        rejected = CsrfViewMiddleware().process_view(request, None, (), {})
+        if rejected is not None:
+            raise ApiError({'detail': 'Нет CSRF-токена'}, status=403)
+        return
+    token = Token.objects.select_related('user').filter(
+        digest=token_digest(key.strip()),
+        user__is_active=True,
+    ).first()
+    if token is None:
+        raise ApiError({'detail': 'Неверный токен'}, status=401)
+    request.user = token.user
+
+
+def api_view(*methods):
+    '''JSON-view: проверка метода и входа, ошибки в JSON.
+
+    Вход по токену или по сессии (см. authenticate); небезопасные
+    методы требуют входа; 404, 403 и ApiError возвращаются JSON-ом,
+    а не HTML-страницами.
+    '''
+
+    allowed = set(methods)
+    if 'GET' in allowed:
+        allowed.add('HEAD')
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = json_response(
+                    request,
+                    {'detail': 'Метод не поддерживается'},
+                    status=405,
+                )
+                response['Allow'] = ', '.join(sorted(allowed))
+                return response
+            try:
+                authenticate(request)
+                if (
+                    request.method not in SAFE_METHODS
+                    and not request.user.is_authenticated
+                ):
+                    raise ApiError({'detail': 'Нужен вход'}, status=401)
+                return view(request, *args, **kwargs)
+            except Http404:
+                error, status = {'detail': 'Не найдено'}, 404
+            except PermissionDenied:
+                error, status = {'detail': 'Недостаточно прав'}, 403
+            except ApiError as api_error:
+                error, status = api_error.errors, api_error.status
+
+            return json_response(request, error, status=status)
+
+        return wrapper
+
+    return decorator
+
+
+def page_size(request):
+    '''Размер страницы из ?limit=, не больше API_MAX_PAGE_SIZE'''
+
+    raw = request.GET.get(LIMIT_PARAM)
+    if raw is None:
+        return API_PAGE_SIZE
+    try:
+        size = int(raw)
+    except ValueError:
+        size = 0
+    if not 0 < size <= API_MAX_PAGE_SIZE:
+        raise ApiError({
+            LIMIT_PARAM: [f'Число от 1 до {API_MAX_PAGE_SIZE}'],
+        })
+
+    return size
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    '''CursorPaginator над values(): объекты страницы — словари'''
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 parse_key=parse_datetime):
+        super().__init__(object_list, per_page, date_field)
+        self.parse_key = parse_key
+
+    def cursor_key(self, obj):
+        return obj[self.date_field]
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(direction, self.cursor_key(obj), obj['id'])
+
+
+def paginated_response(request, queryset, projection, key='pub_date',
+                       parse_key=parse_datetime):
+    '''Страница списка по курсору ?cursor= одним запросом'''
+
+    paginator = ValuesCursorPaginator(
+        projection.values(queryset).order_by(f'-{key}', '-pk'),
+        page_size(request),
+        key,
+        parse_key,
+    )
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+    return json_response(request, {
+        'results': projection.rows(page),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
@@ -0,0 +1,276 @@
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+
+from core.querycount import query_budget
+from posts import follows as follow_authors
+from posts.constants import FOLLOW_BULK_LIMIT
+from posts.forms import CommentForm
+from posts.models import Comment, Follow, Group, Post, User
+
+from .forms import PostApiForm
+from .serializers import (
+    COMMENT_FIELDS,
+    FOLLOW_FIELDS,
+    GROUP_FIELDS,
+    POST_FIELDS,
+    Projection,
+    selected_fields,
+)
+from .utils import (
+    ApiError,
+    api_view,
+    json_response,
+    no_content,
+    paginated_response,
+    request_data,
+)
+
+
+def post_projection(request):
+    return Projection(
+        POST_FIELDS,
+        selected_fields(request, POST_FIELDS),
+        'pub_date',
+    )
+
+
+def detail(request, queryset, projection, status=200):
+    values = projection.values(queryset).first()
+    if values is None:
+        raise ApiError({'detail': 'Не найдено'}, status=404)
+
+    return json_response(request, projection.row(values), status=status)
+
+
+def save_post(request, form, status):
+    if not form.is_valid():
+        raise ApiError({'errors': form.errors})
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+
+    return detail(
+        request,
+        Post.objects.filter(pk=post.pk),
+        post_projection(request),
+        status,
+    )
+
+
+@query_budget(3)
+@api_view('GET', 'POST')
+def posts(request):
+    '''Лента всех постов; POST создаёт пост по правилам PostForm'''
+
+    if request.method == 'POST':
+        data, files = request_data(request)
+        return save_post(request, PostApiForm(data, files), 201)
+
+    return paginated_response(request, Post.objects, post_projection(request))
+
+
+@query_budget(3)
+@api_view('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    '''Пост; изменять и удалять его может только автор'''
+
+    if request.method == 'GET':
+        return detail(
+            request,
+            Post.objects.filter(pk=post_id),
+            post_projection(request),
+        )
+
+    instance = get_object_or_404(
+        Post.objects.select_related('group'),
+        pk=post_id,
+    )
+    if instance.author_id != request.user.pk:
+        raise PermissionDenied
+    if request.method == 'DELETE':
+        instance.delete()
+        return no_content()
+
+    data, files = request_data(request)
+    # PATCH меняет только переданные поля; items() у QueryDict формы
+    # отдаёт значения, а не списки.
+    current = {
+        'text': instance.text,
+        'group': instance.group.slug if instance.group else '',
+    }
+    form = PostApiForm(
+        {**current, **dict(data.items())},
+        files,
+        instance=instance,
+    )
+
+    return save_post(request, form, 200)
+
+
+@query_budget(3)
+@api_view('GET')
+def groups(request):
+    '''Список групп'''
+
+    return paginated_response(
+        request,
+        Group.objects,
+        Projection(GROUP_FIELDS, selected_fields(request, GROUP_FIELDS)),
+        'id',
+        int,
+    )
+
+
+@query_budget(3)
+@api_view('GET')
+def group(request, slug):
+    '''Группа по slug'''
+
+    return detail(
+        request,
+        Group.objects.filter(slug=slug),
+        Projection(GROUP_FIELDS, selected_fields(request, GROUP_FIELDS)),
+    )
+
+
+@query_budget(4)
+@api_view('GET')
+def group_posts(request, slug):
+    '''Лента группы'''
+
+    group = get_object_or_404(Group, slug=slug)
+
+    return paginated_response(
+        request,
+        Post.objects.filter(group=group),
+        post_projection(request),
+    )
+
+
+@query_budget(4)
+@api_view('GET')
+def user_posts(request, username):
+    '''Лента автора'''
+
+    author = get_object_or_404(User, username=username)
+
+    return paginated_response(
+        request,
+        Post.objects.filter(author=author),
+        post_projection(request),
+    )
+
+
+@query_budget(4)
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    '''Комментарии поста; POST добавляет комментарий'''
+
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    projection = Projection(
+        COMMENT_FIELDS,
+        selected_fields(request, COMMENT_FIELDS),
+        'created',
+    )
+    if request.method == 'GET':
+        return paginated_response(
+            request,
+            Comment.objects.filter(post=post),
+            projection,
+            'created',
+        )
+
+    data, _ = request_data(request)
+    form = CommentForm(data)
+    if not form.is_valid():
+        raise ApiError({'errors': form.errors})
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+
+    return detail(
+        request,
+        Comment.objects.filter(pk=comment.pk),
+        projection,
+        201,
+    )
+
+
+def usernames(data, field):
+    names = data.get(field, [])
+    if not isinstance(names, list) or not all(
+        isinstance(name, str) for name in names
+    ):
+        raise ApiError({field: ['Ожидался список имён']})
+
+    return names
+
+
+@query_budget(3)
+@api_view('GET', 'POST', 'PATCH')
+def follows(request):
+    '''Подписки текущего пользователя.
+
+    POST подписывает на author. PATCH подписывает на follow и отписывает
+    от unfollow одной транзакцией, не больше FOLLOW_BULK_LIMIT имён.
+    '''
+
+    if not request.user.is_authenticated:
+        raise ApiError({'detail': 'Нужен вход'}, status=401)
+    if request.method == 'PATCH':
+        return bulk_follow(request)
+    projection = Projection(
+        FOLLOW_FIELDS,
+        selected_fields(request, FOLLOW_FIELDS),
+    )
+    if request.method == 'GET':
+        return paginated_response(
+            request,
+            Follow.objects.filter(user=request.user),
+            projection,
+            'id',
+            int,
+        )
+
+    data, _ = request_data(request)
+    username = data.get('author', '')
+    created = follow_authors.follow(request.user.pk, [username])
+    if not created:
+        author = get_object_or_404(User, username=username)
+        if author == request.user:
+            raise ApiError({'author': ['Нельзя подписаться на себя']})
+
+    return detail(
+        request,
+        Follow.objects.filter(user=request.user, author__username=username),
+        projection,
+        201 if created else 200,
+    )
+
+
+def bulk_follow(request):
+    data, _ = request_data(request)
+    follow, unfollow = usernames(data, 'follow'), usernames(data, 'unfollow')
+    if len(follow) + len(unfollow) > FOLLOW_BULK_LIMIT:
+        raise ApiError(
+            {'detail': f'Не больше {FOLLOW_BULK_LIMIT} имён за запрос'}
+        )
+    with transaction.atomic():
+        unfollowed = follow_authors.unfollow(request.user.pk, unfollow)
+        followed = follow_authors.follow(request.user.pk, follow)
+
+    return json_response(request, {
+        'followed': len(followed),
+        'unfollowed': len(unfollowed),
+    })
+
+
+@api_view('DELETE')
+def follow(request, username):
+    '''Отписка от автора; повторная отписка тоже успешна'''
+
+    follow_authors.unfollow(request.user.pk, [username])
+
+    return no_content()
@@ -0,0 +1,225 @@
+import asyncio
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import sys
+import threading
+
+# Ответ WSGI копится в очереди не больше чем на столько кусков,
+# дальше поток ждёт, пока клиент заберёт уже отданное.
+QUEUE_SIZE = 16
+# Как часто поток пула проверяет, не ушёл ли клиент.
+PUT_POLL = 0.1
+
+
+class ClientGone(Exception):
+    '''Клиент отключился, ответ больше некому отдавать'''
+
+
+class ASGIHandler:
+    '''ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не умеет асинхронные view, поэтому запрос целиком,
+    вместе с отдачей потокового тела, выполняется в одном потоке
+    пула, а цикл событий держит соединения и передаёт ответ кусками.
+    Медленный клиент не занимает поток дольше, чем заполняется
+    очередь из QUEUE_SIZE кусков.
+    '''
+
+    def __init__(self, wsgi_application, workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Тип соединения {scope["type"]} не поддержан')
+        body = await self.read_body(receive)
+        if body is None:
+            return None
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(QUEUE_SIZE)
+        cancelled = threading.Event()
+        task = loop.run_in_executor(
+            self.executor,
+            self.run,
+            self.environ(scope, body),
+            loop,
+            queue,
+            cancelled,
+        )
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            await self.relay(queue, disconnect, send, scope['method'])
+        except ClientGone:
+            pass
+        finally:
+            # Ошибка send, отмена или уход клиента: поток пула
+            # перестаёт ждать места в очереди и закрывает ответ.
+            cancelled.set()
+            disconnect.cancel()
+            await task
+        return None
+
+    async def guarded(self, coroutine, disconnect):
+        '''Результат coroutine или ClientGone, если клиент ушёл раньше'''
+
+        future = asyncio.ensure_future(coroutine)
+        await asyncio.wait(
+            {future, disconnect},
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if not future.done():
+            future.cancel()
+            raise ClientGone
+
+        return future.result()
+
+    async def relay(self, queue, disconnect, send, method):
+        '''Передаёт клиенту ответ из очереди, пока он не ушёл'''
+
+        def forward(message):
+            return self.guarded(send(message), disconnect)
+
+        started = False
+        while True:
+            kind, *data = await self.guarded(queue.get(), disconnect)
+            if kind == 'start':
+                status, headers = data
+                started = True
+                await forward({
+                    'type': 'http.response.start',
+                    'status': status,
+                    'headers': headers,
+                })
+            elif kind == 'body' and method != 'HEAD':
+                await forward({
+                    'type': 'http.response.body',
+                    'body': data[0],
+                    'more_body': True,
+                })
+            elif kind == 'end':
+                break
+        if not started:
+            # Приложение упало до start_response.
+            await forward({
+                'type': 'http.response.start',
+                'status': 500,
+                'headers': [],
+            })
+        await forward({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def wait_disconnect(self, receive):
+        '''Ждёт http.disconnect после того, как тело прочитано'''
+
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    async def read_body(self, receive):
+        '''Тело запроса целиком; None, если клиент ушёл'''
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def environ(self, scope, body):
+        '''WSGI environ по scope ASGI'''
+
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # WSGI хранит путь как байты в latin-1.
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            value = raw_value.decode('latin-1')
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+
+        return environ
+
+    def run(self, environ, loop, queue, cancelled):
+        '''Выполняет WSGI-приложение в потоке пула.
+
+        Когда ASGI-сторона выставила cancelled, ожидание места
+        в очереди прерывается и итератор ответа закрывается.
+        '''
+
+        def put(*item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while not cancelled.is_set():
+                try:
+                    return future.result(timeout=PUT_POLL)
+                except futures.TimeoutError:
+                    pass
+            future.cancel()
+            raise ClientGone
+
+        def start_response(status, headers, exc_info=None):
+            put(
+                'start',
+                int(status.split(' ', 1)[0]),
+                [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            )
+
+        try:
+            try:
+                self.stream(
+                    self.wsgi_application(environ, start_response),
+                    put,
+                )
+            finally:
+                put('end')
+        except ClientGone:
+            pass
+
+    def stream(self, result, put):
+        try:
+            for chunk in result:
+                if chunk:
+                    put('body', chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
@@ -0,0 +1,96 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import routers
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.QUERY_WORKERS,
+                thread_name_prefix='query',
+            )
+    return _executor
+
+
+def in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all())
+
+
+def gather(*calls):
+    '''Выполняет независимые чтения одновременно и возвращает результаты.
+
+    Каждый вызов идёт в потоке пула со своим соединением, поэтому
+    запросы view ждут базу параллельно, а не друг за другом. Поток
+    получает закрепление за основной базой и счётчики запросов
+    вызывающего. Внутри транзакции другие соединения не видят её
+    изменений, поэтому там и при QUERY_WORKERS = 0 вызовы идут
+    по очереди в текущем потоке.
+    '''
+
+    if len(calls) < 2 or not settings.QUERY_WORKERS or in_transaction():
+        return [call() for call in calls]
+    pinned = routers.primary_pinned()
+    wrappers = {
+        alias: list(connections[alias].execute_wrappers)
+        for alias in connections
+    }
+
+    def run(call):
+        close_old_connections()
+        saved = {}
+        for alias, inherited in wrappers.items():
+            connection = connections[alias]
+            saved[alias] = connection.execute_wrappers
+            connection.execute_wrappers = inherited
+        try:
+            if pinned:
+                with routers.use_primary():
+                    return call()
+            return call()
+        finally:
+            for alias, own in saved.items():
+                connections[alias].execute_wrappers = own
+
+    return list(executor().map(run, calls))
+
+
+@contextmanager
+def process_pool(workers, initializer=None, initargs=()):
+    '''Пул из workers процессов или None, если хватает одного.
+
+    Соединения с базой закрываются до запуска пула: дочерние
+    процессы не должны унаследовать их от родителя.
+    '''
+
+    if workers <= 1:
+        yield None
+        return
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initializer,
+        initargs=initargs,
+    ) as pool:
+        yield pool
+
+
+def add_workers_argument(parser):
+    '''Опция --workers команд, которые работают через process_pool'''
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count(),
+        help='Число процессов, по умолчанию по числу ядер',
+    )
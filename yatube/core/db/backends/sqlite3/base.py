@@ -0,0 +1,95 @@
+import logging
+import time
+
+from django.db.backends.sqlite3 import base
+
+logger = logging.getLogger(__name__)
+
+# WAL пускает читателей параллельно с писателем; NORMAL в WAL не
+# теряет целостность, только последние транзакции при отказе ОС.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+DEFAULT_TIMEOUT = 20
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.05
+
+
+def is_locked(error):
+    return 'database is locked' in str(error)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    '''Повторяет запрос вне транзакции, если база занята.
+
+    Внутри транзакции повтор не поможет: блокировку держит она сама
+    или писатель, которого она ждёт, поэтому ошибка уходит наверх.
+    '''
+
+    retries = LOCK_RETRIES
+
+    def _retry(self, method, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args)
+            # Курсор sqlite3 бросает свои исключения: в ошибки Django
+            # их превращает обёртка уровнем выше.
+            except base.Database.OperationalError as error:
+                if (
+                    not is_locked(error)
+                    or self.connection.in_transaction
+                    or attempt == self.retries
+                ):
+                    raise
+                logger.warning('База занята, повтор %d', attempt + 1)
+                time.sleep(LOCK_RETRY_DELAY * 2 ** attempt)
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''sqlite3 с WAL, настроенными PRAGMA и BEGIN IMMEDIATE.
+
+    OPTIONS понимает, кроме параметров sqlite3.connect:
+    pragmas — PRAGMA поверх DEFAULT_PRAGMAS, lock_retries — сколько
+    раз повторять запрос вне транзакции на «database is locked»,
+    transaction_mode — режим BEGIN транзакций (IMMEDIATE по умолчанию).
+    IMMEDIATE берёт блокировку записи сразу, и транзакция ждёт её
+    в busy timeout, а не падает при попытке повысить блокировку.
+    '''
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.lock_retries = kwargs.pop('lock_retries', LOCK_RETRIES)
+        self.transaction_mode = kwargs.pop('transaction_mode', 'IMMEDIATE')
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.retries = self.lock_retries
+
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        begin = 'BEGIN'
+        if self.transaction_mode:
+            begin = f'BEGIN {self.transaction_mode}'
+        self.cursor().execute(begin)
@@ -0,0 +1,95 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import routers
+from .querycount import count_queries
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    '''Считает SQL-запросы каждого запроса и пишет в лог нарушителей.
+
+    Повторы одной формы запроса (N+1) и превышение бюджета view,
+    объявленного через query_budget, уходят в warning. Бюджет
+    относится к чтению: запись с её сигналами под него не попадает.
+    Отчёт остаётся в response.query_report для тестов.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        budget = None
+        if match and request.method in SAFE_METHODS:
+            budget = getattr(match.func, 'query_budget', None)
+        response.query_report = report = {
+            'view': view,
+            'count': recorder.count,
+            'duration': recorder.duration,
+            'budget': budget,
+            'repeated': recorder.repeated(),
+        }
+        for shape, (count, template) in report['repeated'].items():
+            logger.warning(
+                'N+1 в %s (шаблон %s): %d раз %s',
+                view,
+                template,
+                count,
+                shape,
+            )
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                '%s: %d запросов при бюджете %d',
+                view,
+                recorder.count,
+                budget,
+            )
+
+        return response
+
+
+class PrimaryPinMiddleware:
+    '''Read-your-writes для реплик.
+
+    Небезопасные методы читают с основной базы. После записи ответ
+    ставит cookie, и REPLICA_PIN_SECONDS следующие запросы этого
+    клиента тоже читают с основной, пока реплики догоняют.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def __call__(self, request):
+        routers.reset()
+        if request.method not in SAFE_METHODS or self.pinned(request):
+            routers.pin()
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+                response.set_cookie(
+                    PIN_COOKIE,
+                    str(time.time() + seconds),
+                    max_age=seconds,
+                    httponly=True,
+                )
+        finally:
+            routers.reset()
+
+        return response
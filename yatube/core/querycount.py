@@ -0,0 +1,111 @@
+from collections import Counter
+from contextlib import contextmanager
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+NUMBER_RE = re.compile(r'\b\d+\b')
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+TRANSACTION_RE = re.compile(
+    r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b',
+    re.IGNORECASE,
+)
+
+
+def query_shape(sql):
+    '''SQL без литералов: запросы из одного цикла дают одну форму'''
+
+    sql = NUMBER_RE.sub('?', sql)
+
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+def current_template():
+    '''Имя самого вложенного шаблона, который сейчас рендерится'''
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        template = frame.f_locals.get('self')
+        if isinstance(template, Template) and template.origin:
+            return template.origin.template_name
+        frame = frame.f_back
+
+    return None
+
+
+class QueryRecorder:
+    '''Считает запросы, их время и повторы одной формы.
+
+    Подключается через connection.execute_wrapper, поэтому работает
+    и без DEBUG. Шаблон ищется по стеку только на повторе, который
+    впервые достиг порога. Запросы из потоков gather() пишутся
+    в тот же счётчик, поэтому запись идёт под блокировкой.
+    '''
+
+    def __init__(self, repeat_threshold=None):
+        if repeat_threshold is None:
+            repeat_threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 3)
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.origins = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.duration += time.perf_counter() - start
+                self.count += 1
+                if not TRANSACTION_RE.match(sql):
+                    self.record(sql)
+
+    def record(self, sql):
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.repeat_threshold:
+            self.origins[shape] = current_template()
+
+    def repeated(self):
+        '''Формы, повторённые не меньше порога: {форма: (число, шаблон)}'''
+
+        return {
+            shape: (self.shapes[shape], template)
+            for shape, template in self.origins.items()
+        }
+
+
+@contextmanager
+def count_queries(using=None, repeat_threshold=None):
+    '''Записывает запросы к базам внутри блока'''
+
+    recorder = QueryRecorder(repeat_threshold)
+    aliases = [using] if using else list(connections)
+    wrappers = [
+        connections[alias].execute_wrapper(recorder) for alias in aliases
+    ]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        yield recorder
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+
+def query_budget(limit):
+    '''Объявляет, сколько запросов допустимо view на один запрос'''
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
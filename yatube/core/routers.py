@@ -0,0 +1,118 @@
+from contextlib import ContextDecorator
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+# Реплика -> момент, раньше которого её не пробуем снова.
+_unhealthy = {}
+
+
+def replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def primary_pinned():
+    '''Чтение должно идти с основной базы'''
+
+    return (
+        getattr(_state, 'primary', False)
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+def wrote():
+    '''В текущем запросе уже была запись'''
+
+    return getattr(_state, 'wrote', False)
+
+
+def pin():
+    '''До reset() чтение идёт с основной базы'''
+
+    _state.primary = True
+
+
+def reset():
+    _state.primary = False
+    _state.wrote = False
+
+
+class use_primary(ContextDecorator):
+    '''Блок или view, который читает только с основной базы'''
+
+    # Экземпляр декоратора общий для всех потоков, поэтому прежнее
+    # состояние хранится в стеке потока, а не в self.
+
+    def __enter__(self):
+        _state.__dict__.setdefault('saved', []).append(
+            getattr(_state, 'primary', False)
+        )
+        pin()
+        return self
+
+    def __exit__(self, *exc):
+        # После записи чтение остаётся на основной базе.
+        _state.primary = _state.saved.pop() or wrote()
+        return False
+
+
+def healthy(alias):
+    '''Реплика отвечает; упавшая пропускается REPLICA_RETRY_SECONDS'''
+
+    retry_at = _unhealthy.get(alias)
+    if retry_at is not None and retry_at > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning('Реплика %s недоступна, чтение с основной', alias)
+        _unhealthy[alias] = (
+            time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+        )
+        return False
+    _unhealthy.pop(alias, None)
+
+    return True
+
+
+class PrimaryReplicaRouter:
+    '''Запись в основную базу, чтение со случайной живой реплики.
+
+    После записи чтение до конца запроса идёт с основной базы, чтобы
+    пользователь видел свои изменения; между запросами это держит
+    PrimaryPinMiddleware. Без REPLICA_DATABASES всё идёт в default.
+    '''
+
+    def db_for_read(self, model, **hints):
+        if primary_pinned():
+            return DEFAULT_DB_ALIAS
+        candidates = list(replicas())
+        random.shuffle(candidates)
+        for alias in candidates:
+            if healthy(alias):
+                return alias
+
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        pin()
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики репликацией.
+        return db not in replicas()
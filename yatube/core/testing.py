@@ -0,0 +1,95 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+
+from . import routers
+
+
+class QueryBudgetMixin:
+    '''Проверки TestCase по отчёту QueryBudgetMiddleware'''
+
+    def assertQueryBudget(self, response, budget=None):
+        '''Запросов не больше бюджета и нет повторов одной формы'''
+
+        report = response.query_report
+        if budget is None:
+            budget = report['budget']
+        repeated = '\n'.join(
+            f'{count} x {shape} ({template})'
+            for shape, (count, template) in report['repeated'].items()
+        )
+        self.assertFalse(
+            repeated,
+            f'{report["view"]}: повторяющиеся запросы\n{repeated}',
+        )
+        if budget is not None:
+            self.assertLessEqual(
+                report['count'],
+                budget,
+                f'{report["view"]}: {report["count"]} запросов '
+                f'при бюджете {budget}',
+            )
+
+
+class SimulatedReplicas:
+    '''Реплики из отдельных файлов SQLite для тестов роутера.
+
+    sync() копирует основную базу в реплики backup API SQLite, между
+    вызовами реплики отстают как при настоящей репликации. fail()
+    делает реплику недоступной.
+    '''
+
+    def __init__(self, count=2):
+        self.aliases = [f'replica{number}' for number in range(1, count + 1)]
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp()
+        for alias in self.aliases:
+            connections.databases[alias] = {
+                **connections.databases[DEFAULT_DB_ALIAS],
+                'NAME': os.path.join(self.directory, f'{alias}.sqlite3'),
+                'TEST': {},
+            }
+            connections.ensure_defaults(alias)
+        self.settings = override_settings(REPLICA_DATABASES=self.aliases)
+        self.settings.enable()
+        routers._unhealthy.clear()
+        self.sync()
+        return self
+
+    def __exit__(self, *exc):
+        self.settings.disable()
+        for alias in self.aliases:
+            self.close(alias)
+            del connections.databases[alias]
+        routers._unhealthy.clear()
+        shutil.rmtree(self.directory)
+        return False
+
+    def close(self, alias):
+        if hasattr(connections._connections, alias):
+            getattr(connections._connections, alias).close()
+            delattr(connections._connections, alias)
+
+    def sync(self, *aliases):
+        '''Догоняет реплики до текущего состояния основной базы'''
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        for alias in aliases or self.aliases:
+            self.close(alias)
+            target = sqlite3.connect(connections.databases[alias]['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+
+    def fail(self, alias):
+        '''Реплика больше не открывается'''
+
+        self.close(alias)
+        connections.databases[alias]['NAME'] = self.directory
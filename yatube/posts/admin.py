@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import backend as search_backend
 
 
 @admin.register(Post)
@@ -13,6 +14,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        '''Поиск по тому же индексу, что и на сайте'''
+
+        if not search_term:
+            return queryset, False
+
+        return search_backend.filter(queryset, search_term), False
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
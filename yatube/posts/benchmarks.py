@@ -0,0 +1,403 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import math
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import OperationalError, connections, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.asgi import ASGIHandler
+from core.querycount import count_queries
+from . import follows
+from .constants import NUMBER_OF_POSTS
+from .models import Follow, Group, Post, User
+from .seeding import sentence
+
+
+def percentile(values, share):
+    '''Перцентиль по ближайшему рангу'''
+
+    ordered = sorted(values)
+    rank = max(math.ceil(share * len(ordered)) - 1, 0)
+
+    return ordered[rank]
+
+
+def upload(rng):
+    buffer = BytesIO()
+    color = tuple(rng.randrange(256) for _ in range(3))
+    Image.new('RGB', (640, 360), color).save(buffer, 'PNG')
+
+    return SimpleUploadedFile('bench.png', buffer.getvalue(), 'image/png')
+
+
+class Targets:
+    '''Объекты, к которым обращаются сценарии, выбираются из seed'''
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(User.objects.order_by('pk').values_list(
+            'username',
+            flat=True,
+        ))
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    def username(self):
+        # Первые пользователи генератора — самые популярные авторы.
+        rank = int(self.rng.paretovariate(1))
+
+        return self.usernames[min(rank, len(self.usernames)) - 1]
+
+    def slug(self):
+        return self.rng.choice(self.slugs)
+
+    def post_id(self):
+        return self.rng.choice(self.post_ids)
+
+
+def scenarios(images=False):
+    '''Имя сценария -> функция (client, targets, rng) -> response'''
+
+    def create(client, targets, rng):
+        data = {'text': sentence(rng)}
+        if images:
+            data['image'] = upload(rng)
+        return client.post(reverse('posts:post_create'), data)
+
+    return {
+        'index': lambda client, targets, rng: client.get(
+            reverse('posts:index')
+        ),
+        'group_posts': lambda client, targets, rng: client.get(
+            reverse('posts:group_list', args=[targets.slug()])
+        ),
+        'profile': lambda client, targets, rng: client.get(
+            reverse('posts:profile', args=[targets.username()])
+        ),
+        'post_detail': lambda client, targets, rng: client.get(
+            reverse('posts:post_detail', args=[targets.post_id()])
+        ),
+        'follow_index': lambda client, targets, rng: client.get(
+            reverse('posts:follow_index')
+        ),
+        'post_create': create,
+        'add_comment': lambda client, targets, rng: client.post(
+            reverse('posts:add_comment', args=[targets.post_id()]),
+            {'text': sentence(rng, 6)},
+        ),
+        # Те же данные через JSON API для сравнения с HTML.
+        'api_posts': lambda client, targets, rng: client.get(
+            reverse('api:posts')
+        ),
+        'api_group_posts': lambda client, targets, rng: client.get(
+            reverse('api:group_posts', args=[targets.slug()])
+        ),
+        'api_user_posts': lambda client, targets, rng: client.get(
+            reverse('api:user_posts', args=[targets.username()])
+        ),
+        'api_post': lambda client, targets, rng: client.get(
+            reverse('api:post', args=[targets.post_id()])
+        ),
+        'api_comments': lambda client, targets, rng: client.get(
+            reverse('api:comments', args=[targets.post_id()])
+        ),
+    }
+
+
+def run_benchmarks(iterations=50, names=None, seed=0, cached=False,
+                   images=False):
+    '''Гоняет сценарии тестовым клиентом и возвращает сводку по каждому.
+
+    Задержка и число запросов меряются на всех итерациях, пик памяти
+    отдельным проходом под tracemalloc, чтобы трассировка не портила
+    задержку. Без cached кеш чистится перед каждым запросом.
+    '''
+
+    rng = random.Random(seed)
+    targets = Targets(rng)
+    user = User.objects.get(username=targets.usernames[-1])
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for name, scenario in scenarios(images).items():
+        if names and name not in names:
+            continue
+        latencies, queries = [], []
+        for _ in range(iterations):
+            if not cached:
+                cache.clear()
+            with count_queries() as recorder:
+                start = time.perf_counter()
+                response = scenario(client, targets, rng)
+                latencies.append(time.perf_counter() - start)
+            assert response.status_code < 400, (name, response.status_code)
+            queries.append(recorder.count)
+        if not cached:
+            cache.clear()
+        tracemalloc.start()
+        scenario(client, targets, rng)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {
+            'iterations': iterations,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': statistics.mean(latencies) * 1000,
+            'queries': statistics.mean(queries),
+            'max_queries': max(queries),
+            'peak_memory_kb': peak / 1024,
+        }
+
+    return results
+
+
+def compare(baseline, current):
+    '''Относительное изменение p95 и запросов к прошлому прогону'''
+
+    changes = {}
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        changes[name] = {
+            'p95_ms': result['p95_ms'] / before['p95_ms'] - 1
+            if before['p95_ms'] else 0.0,
+            'queries': result['queries'] - before['queries'],
+        }
+
+    return changes
+
+
+def concurrent_throughput(alias, readers=4, writers=1, seconds=3.0):
+    '''Чтения и записи в секунду, когда писатели работают параллельно.
+
+    Читатели повторяют выборку главной страницы, писатели добавляют
+    посты в транзакциях; у каждого потока своё соединение с alias.
+    '''
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    table = Post._meta.db_table
+
+    def loop(operation, counter):
+        connection = connections[alias]
+        done = errors = 0
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    operation(connection)
+                    done += 1
+                except OperationalError:
+                    errors += 1
+        finally:
+            connection.close()
+        with lock:
+            counts[counter] += done
+            counts['errors'] += errors
+
+    def read(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, text, pub_date FROM {table} '
+                'ORDER BY pub_date DESC, id DESC LIMIT %s',
+                [NUMBER_OF_POSTS + 1],
+            )
+            cursor.fetchall()
+
+    def write(connection):
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (text, pub_date, updated, author_id, '
+                'image, image_variants, comments_count) '
+                'VALUES (%s, %s, %s, 1, \'\', 0, 0)',
+                ['Запись', timezone.now(), timezone.now()],
+            )
+
+    threads = [
+        threading.Thread(target=loop, args=(read, 'reads'))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=loop, args=(write, 'writes'))
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'reads_per_second': counts['reads'] / seconds,
+        'writes_per_second': counts['writes'] / seconds,
+        'errors': counts['errors'],
+    }
+
+
+def request_scope(url):
+    '''ASGI scope анонимного GET-запроса'''
+
+    path, _, query = url.partition('?')
+
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def server_throughput(mode, urls, concurrency=8, requests=200):
+    '''Запросов в секунду и задержка при concurrency клиентах.
+
+    wsgi — пул потоков, как у многопоточного WSGI-сервера; asgi —
+    корутины одного цикла событий поверх ASGIHandler. Адреса
+    запрашиваются по кругу.
+    '''
+
+    handler = WSGIHandler()
+    adapter = ASGIHandler(handler, workers=concurrency)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def wsgi_request(number):
+        environ = adapter.environ(request_scope(urls[number % len(urls)]), b'')
+        codes = []
+        start = time.perf_counter()
+        result = handler(
+            environ,
+            lambda status, headers, exc_info=None: codes.append(
+                int(status[:3])
+            ),
+        )
+        b''.join(result)
+        result.close()
+        latencies.append(time.perf_counter() - start)
+        with lock:
+            statuses.update(codes)
+
+    async def asgi_client(numbers):
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.update([message['status']])
+
+        for number in numbers:
+            start = time.perf_counter()
+            requests = [{'type': 'http.request', 'body': b''}]
+
+            async def receive():
+                if requests:
+                    return requests.pop()
+                # Как у сервера: после тела receive ждёт отключения.
+                return await asyncio.Future()
+
+            await adapter(
+                request_scope(urls[number % len(urls)]),
+                receive,
+                send,
+            )
+            latencies.append(time.perf_counter() - start)
+
+    async def asgi_run():
+        await asyncio.gather(*(
+            asgi_client(range(client, requests, concurrency))
+            for client in range(concurrency)
+        ))
+
+    started = time.perf_counter()
+    if mode == 'wsgi':
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(wsgi_request, range(requests)))
+    else:
+        asyncio.run(asgi_run())
+    seconds = time.perf_counter() - started
+    adapter.executor.shutdown()
+
+    return {
+        'requests_per_second': requests / seconds,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'errors': sum(
+            count for status, count in statuses.items() if status >= 500
+        ),
+    }
+
+
+def legacy_follow(user, usernames):
+    # Прежний путь profile_follow: автор, exists() и create().
+    for username in usernames:
+        author = User.objects.get(username=username)
+        if author != user and not Follow.objects.filter(
+            user=user,
+            author=author,
+        ).exists():
+            Follow.objects.create(user=user, author=author)
+
+
+def legacy_unfollow(user, usernames):
+    # Прежний путь profile_unfollow: автор, exists() и delete().
+    for username in usernames:
+        author = User.objects.get(username=username)
+        if Follow.objects.filter(user=user, author=author).exists():
+            Follow.objects.filter(user=user, author=author).delete()
+
+
+FOLLOW_PATHS = {
+    'legacy': (legacy_follow, legacy_unfollow),
+    'statement': (
+        lambda user, names: [follows.follow(user.pk, [n]) for n in names],
+        lambda user, names: [follows.unfollow(user.pk, [n]) for n in names],
+    ),
+    'bulk': (
+        lambda user, names: follows.follow(user.pk, names),
+        lambda user, names: follows.unfollow(user.pk, names),
+    ),
+}
+
+
+def follow_paths(user, usernames, rounds=5):
+    '''Время и запросы на подписку и отписку от каждого автора.
+
+    Каждый путь из FOLLOW_PATHS rounds раз подписывает user на всех
+    usernames и отписывает обратно; запросы считаются вместе с
+    пересчётом счётчиков и лент.
+    '''
+
+    results = {}
+    operations = rounds * len(usernames) * 2
+    for name, (follow, unfollow) in FOLLOW_PATHS.items():
+        timings = []
+        queries = 0
+        for _ in range(rounds):
+            with count_queries() as recorder:
+                started = time.perf_counter()
+                follow(user, usernames)
+                unfollow(user, usernames)
+                timings.append(time.perf_counter() - started)
+            queries += recorder.count
+        results[name] = {
+            'ms_per_operation': sum(timings) * 1000 / operations,
+            'queries_per_operation': queries / operations,
+        }
+
+    return results
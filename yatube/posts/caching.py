@@ -0,0 +1,300 @@
+from functools import wraps
+import hashlib
+import math
+import random
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+
+from core.routers import use_primary
+
+from .constants import (
+    CACHE_EARLY_REFRESH_BETA,
+    CACHE_LOCK_POLL,
+    CACHE_LOCK_TIMEOUT,
+    CACHE_LOCK_WAIT,
+    FRAGMENT_CACHE_TIMEOUT,
+    PAGE_STALE_TIMEOUT,
+)
+
+GENERATION_KEY = 'generation:{}'
+FRAGMENT_KEY = 'post_fragment:{}:{}:{}:{:d}'
+PAGE_KEY = 'page:{}:{}:{}'
+LOCK_KEY = 'lock:{}'
+METRICS_KEY = 'cache_metrics:{}:{}'
+OUTCOMES = ('hit', 'stale', 'early', 'refresh', 'wait', 'miss')
+# Бэкенды, у которых каждый процесс видит свой кеш.
+PROCESS_LOCAL_BACKENDS = (DummyCache, LocMemCache)
+POST_TEMPLATE = 'posts/includes/post_template.html'
+
+
+def index_namespaces():
+    return ('posts',)
+
+
+def group_namespaces(slug):
+    return (f'group:{slug}',)
+
+
+def profile_namespaces(user_id):
+    # По id: имя может быть длинным и не ASCII, ключ memcached — нет.
+    return (f'profile:{user_id}',)
+
+
+def fragment_namespaces():
+    return ('post_fragments',)
+
+
+def follow_graph_namespaces():
+    return ('follow_graph',)
+
+
+def new_generation():
+    # Значение от времени не повторяет поколения, вытесненные из кеша.
+    return time.time_ns()
+
+
+def generations(namespaces):
+    '''Текущие поколения пространств имён за один поход в кеш'''
+
+    keys = [GENERATION_KEY.format(name) for name in namespaces]
+    found = cache.get_many(keys)
+    missing = {key: new_generation() for key in keys if key not in found}
+    for key, value in missing.items():
+        if not cache.add(key, value, timeout=None):
+            missing[key] = cache.get(key, value)
+    found.update(missing)
+
+    return [found[key] for key in keys]
+
+
+def bump(*namespaces):
+    '''Сдвигает поколения, закешированные страницы перестают читаться'''
+
+    for name in namespaces:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_generation(), timeout=None)
+
+
+def shared():
+    '''Кеш общий для процессов сервера.
+
+    Поколения, блокировки fetch и счётчики исходов работают между
+    воркерами только с общим бэкендом (Memcached, Redis, база);
+    с LocMemCache у каждого процесса они свои.
+    '''
+
+    return not isinstance(
+        caches[DEFAULT_CACHE_ALIAS],
+        PROCESS_LOCAL_BACKENDS,
+    )
+
+
+def record(name, outcome):
+    '''Счётчик исхода чтения кеша, общий для процессов при shared()'''
+
+    key = METRICS_KEY.format(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def metrics(*names):
+    '''Исходы чтения по именам и доля каждого: hit — свежая запись,
+    stale — старая запись, пока другой запрос её пересобирает,
+    early — досрочное обновление, refresh — пересборка устаревшей,
+    wait — дождались чужой сборки, miss — собрали без записи'''
+
+    keys = {
+        METRICS_KEY.format(name, outcome): (name, outcome)
+        for name in names
+        for outcome in OUTCOMES
+    }
+    found = cache.get_many(keys)
+    report = {}
+    for name in names:
+        counts = {
+            outcome: found.get(METRICS_KEY.format(name, outcome), 0)
+            for outcome in OUTCOMES
+        }
+        total = sum(counts.values())
+        report[name] = {
+            'total': total,
+            **counts,
+            **{
+                f'{outcome}_rate': counts[outcome] / total if total else 0.0
+                for outcome in OUTCOMES
+            },
+        }
+
+    return report
+
+
+def store(key, compute, timeout, version, stale, cacheable):
+    started = time.perf_counter()
+    value = compute()
+    elapsed = time.perf_counter() - started
+    if cacheable(value):
+        cache.set(
+            key,
+            (value, version, time.time() + timeout, elapsed),
+            timeout + stale,
+        )
+
+    return value
+
+
+def fetch(
+    key,
+    compute,
+    timeout,
+    version=None,
+    name='default',
+    stale=PAGE_STALE_TIMEOUT,
+    cacheable=lambda value: True,
+):
+    '''Значение из кеша с мягким сроком timeout и защитой от толпы.
+
+    Запись живёт timeout + stale секунд. После мягкого срока или при
+    смене version значение пересобирает один запрос, взявший
+    блокировку, а остальные тем временем получают старое. Без записи
+    остальные ждут чужую сборку до CACHE_LOCK_WAIT секунд. Незадолго
+    до срока запись обновляется досрочно с вероятностью, растущей
+    ко сроку и со временем сборки (XFetch), чтобы записи не истекали
+    под нагрузкой одновременно.
+    '''
+
+    lock = LOCK_KEY.format(key)
+    entry = cache.get(key)
+    if entry is not None:
+        value, entry_version, expires, elapsed = entry
+        current = entry_version == version
+        # 1 - random() лежит в (0, 1], логарифм отрицательный.
+        early = elapsed * CACHE_EARLY_REFRESH_BETA * math.log(
+            1 - random.random()
+        )
+        if current and time.time() - early < expires:
+            record(name, 'hit')
+            return value
+        if not cache.add(lock, 1, CACHE_LOCK_TIMEOUT):
+            record(name, 'stale')
+            return value
+        record(
+            name,
+            'early' if current and time.time() < expires else 'refresh',
+        )
+    elif not cache.add(lock, 1, CACHE_LOCK_TIMEOUT):
+        deadline = time.monotonic() + CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(CACHE_LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None and entry[1] == version:
+                record(name, 'wait')
+                return entry[0]
+        record(name, 'miss')
+        return store(key, compute, timeout, version, stale, cacheable)
+    else:
+        record(name, 'miss')
+    try:
+        return store(key, compute, timeout, version, stale, cacheable)
+    finally:
+        cache.delete(lock)
+
+
+def cacheable_response(response):
+    '''Ответ можно отдавать другим запросам: 200, без private
+    и без cookie, которые нельзя раздавать чужим сессиям'''
+
+    if response.streaming or response.status_code != 200:
+        return False
+    if 'private' in response.get('Cache-Control', ()):
+        return False
+
+    return not response.cookies
+
+
+def cache_page_versioned(timeout, key_prefix, namespaces):
+    '''Кеш страницы с поколениями namespaces(**kwargs) как версией.
+
+    Запись в модели сдвигает поколение, и страница пересобирается
+    одним запросом через fetch, пока остальные получают прежнюю;
+    поэтому timeout может быть большим. Ключ — адрес страницы
+    и читатель: страницы показывают его имя и кнопки. Браузеру срок
+    записи не передаётся: он переспрашивает страницу по ETag.
+    '''
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            version = '.'.join(
+                str(generation)
+                for generation in generations(namespaces(**kwargs))
+            )
+            reader = request.user.pk if request.user.is_authenticated else ''
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+            def render():
+                # Отстающая реплика сохранила бы старую страницу под
+                # новым поколением; промах кеша редок, читаем с основной.
+                with use_primary():
+                    return view(request, *args, **kwargs)
+
+            response = fetch(
+                PAGE_KEY.format(key_prefix, reader, path),
+                render,
+                timeout,
+                version,
+                key_prefix,
+                cacheable=cacheable_response,
+            )
+            patch_cache_control(response, private=True, max_age=0)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def render_post_fragments(posts, hide_group=False):
+    '''HTML карточек постов; готовые карточки берутся одним get_many.
+
+    Ключ карточки содержит id и время изменения поста, поэтому правка
+    поста сама выводит старую карточку из оборота.
+    '''
+
+    posts = list(posts)
+    generation, = generations(fragment_namespaces())
+    keys = [
+        FRAGMENT_KEY.format(
+            generation,
+            post.pk,
+            post.updated.timestamp(),
+            hide_group,
+        )
+        for post in posts
+    ]
+    fragments = cache.get_many(keys)
+    rendered = {}
+    for key, post in zip(keys, posts):
+        if key not in fragments:
+            rendered[key] = render_to_string(
+                POST_TEMPLATE,
+                {'post': post, 'hide_group': hide_group},
+            )
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(rendered)
+
+    return [fragments[key] for key in keys]
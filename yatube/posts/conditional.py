@@ -0,0 +1,117 @@
+from functools import wraps
+import hashlib
+
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Comment, Follow, Group, Post, Recommendation, User
+
+
+def latest(queryset, field):
+    '''Подзапрос MAX(field), который SQLite берёт с края индекса'''
+
+    return Subquery(
+        queryset.order_by(f'-{field}').values(field)[:1]
+    )
+
+
+def post_validators(request, post_id):
+    '''Изменение поста, последний комментарий и счётчики страницы поста'''
+
+    return Post.objects.filter(pk=post_id).annotate(
+        last_comment=latest(
+            Comment.objects.filter(post=OuterRef('pk')),
+            'created',
+        ),
+    ).values_list(
+        'updated',
+        'last_comment',
+        'comments_count',
+        'group__title',
+        'author__stats__posts_count',
+    ).first()
+
+
+def group_validators(request, slug):
+    '''Последняя правка поста группы и её счётчик'''
+
+    return Group.objects.filter(slug=slug).annotate(
+        last_post=latest(
+            Post.objects.filter(group=OuterRef('pk')),
+            'updated',
+        ),
+    ).values_list(
+        'last_post',
+        'posts_count',
+        'title',
+        'description',
+    ).first()
+
+
+def profile_validators(request, username):
+    '''Правка поста автора, счётчики, подписка читателя и пересчёт
+    рекомендаций, которые автор видит на своей странице'''
+
+    user_id = request.user.pk if request.user.is_authenticated else None
+
+    return User.objects.filter(username=username).annotate(
+        last_post=latest(
+            Post.objects.filter(author=OuterRef('pk')),
+            'updated',
+        ),
+        followed=Exists(Follow.objects.filter(
+            user_id=user_id,
+            author=OuterRef('pk'),
+        )),
+        # Пачка рекомендаций пишется разом, дата первой — дата пачки.
+        recommended=Subquery(Recommendation.objects.filter(
+            user=OuterRef('pk'),
+            rank=0,
+        ).values('computed')[:1]),
+    ).values_list(
+        'last_post',
+        'recommended',
+        'stats__posts_count',
+        'stats__followers_count',
+        'stats__following_count',
+        'followed',
+    ).first()
+
+
+def conditional_page(validators):
+    '''ETag и Last-Modified страницы без её сборки.
+
+    validators(request, **kwargs) одним запросом возвращает кортеж
+    значений, от которых зависит страница, или None, если объекта
+    нет. Совпавший ETag отвечает 304 до view и кеша страниц.
+    Last-Modified — самая поздняя дата кортежа; 304 по одному
+    If-Modified-Since не отдаётся, счётчики меняются без смены дат.
+    '''
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            values = validators(request, **kwargs)
+            if values is None:
+                return view(request, *args, **kwargs)
+            # Страница зависит и от читателя: ссылки, кнопка подписки.
+            raw = repr((values, request.user.pk)).encode()
+            etag = quote_etag(hashlib.md5(raw).hexdigest())
+            dates = [value for value in values if hasattr(value, 'timestamp')]
+            last_modified = int(max(dates).timestamp()) if dates else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,2 +1,41 @@
 NUMBER_OF_POSTS = 10
 NUMBER_OF_CHARACTERS_IN_POST_TITLE = 15
+PAGE_PARAM = 'page'
+CURSOR_PARAM = 'cursor'
+FANOUT_FOLLOWERS_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+PAGE_CACHE_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+THUMBNAIL_GEOMETRY = '1920x1080'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+IMAGE_VARIANT_DIR = 'posts/variants'
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280, 1920)
+IMAGE_VARIANT_RATIO = (16, 9)
+IMAGE_VARIANT_QUALITY = 80
+# (формат Pillow, расширение, признак поддержки в Pillow)
+IMAGE_VARIANT_FORMATS = (
+    ('WEBP', 'webp', 'webp'),
+    ('JPEG', 'jpg', 'jpg'),
+)
+IMAGE_VARIANT_FALLBACK_WIDTH = 1280
+EXPORT_CHUNK_SIZE = 2000
+COMMENTS_PER_PAGE = 20
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+FOLLOW_BULK_LIMIT = 100
+RECOMMENDATIONS_PER_USER = 10
+RECOMMENDATION_SIMILAR_AUTHORS = 50
+RECOMMENDATION_FOLLOWER_SAMPLE = 500
+RECOMMENDATION_BATCH_SIZE = 500
+TRENDING_HALF_LIFE = 12 * 60 * 60
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOWERS_WEIGHT = 0.5
+TRENDING_MIN_SCORE = 0.01
+TRENDING_MAX_DRIFT = 14 * 24 * 60 * 60
+TRENDING_TOP_K = 30
+TRENDING_GROUPS = 10
+TRENDING_CACHE_TIMEOUT = 60
+PAGE_STALE_TIMEOUT = 10 * 60
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 5
+CACHE_LOCK_POLL = 0.05
+CACHE_EARLY_REFRESH_BETA = 1.0
@@ -0,0 +1,63 @@
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# (модель, счётчик, модель-источник, поле связи, поле модели для связи)
+COUNTERS = (
+    ('Group', 'posts_count', 'Post', 'group', 'pk'),
+    ('Post', 'comments_count', 'Comment', 'post', 'pk'),
+    ('AuthorStats', 'posts_count', 'Post', 'author', 'user'),
+    ('AuthorStats', 'followers_count', 'Follow', 'author', 'user'),
+    ('AuthorStats', 'following_count', 'Follow', 'user', 'user'),
+)
+
+
+def posts_model(name):
+    return apps.get_model('posts', name)
+
+
+def change(queryset, field, delta):
+    '''Сдвигает счётчик одним UPDATE без чтения строки'''
+
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def actual_count(source, link, outer):
+    '''Подзапрос с настоящим числом связанных строк'''
+
+    counted = source.objects.filter(
+        **{link: OuterRef(outer)}
+    ).order_by().values(link).annotate(total=Count('pk')).values('total')
+
+    return Coalesce(Subquery(counted), 0)
+
+
+def create_missing_stats():
+    '''Заводит строку счётчиков каждому пользователю без неё'''
+
+    stats = posts_model('AuthorStats')
+    missing = get_user_model().objects.filter(stats__isnull=True)
+    stats.objects.bulk_create(
+        (stats(user_id=pk) for pk in missing.values_list('pk', flat=True)),
+        batch_size=500,
+    )
+
+
+def recount(dry_run=False):
+    '''Пересчитывает все счётчики, возвращает число разошедшихся строк'''
+
+    drift = {}
+    for name, field, source, link, outer in COUNTERS:
+        model = posts_model(name)
+        actual = actual_count(posts_model(source), link, outer)
+        stale = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        )
+        drift[f'{name}.{field}'] = stale.count()
+        if not dry_run and drift[f'{name}.{field}']:
+            model.objects.update(**{field: actual})
+
+    return drift
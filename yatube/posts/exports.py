@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+
+from django.core.files.storage import default_storage
+
+from core.concurrent import process_pool
+
+from .constants import EXPORT_CHUNK_SIZE
+from .models import Comment, Post
+
+FORMATS = {
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'csv': ('csv', 'text/csv'),
+}
+# Столбец выгрузки -> выражение values_list().
+COLUMNS = {
+    'posts': {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'comments_count': 'comments_count',
+    },
+    'comments': {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+}
+MODELS = {
+    'posts': Post,
+    'comments': Comment,
+}
+
+
+class Echo:
+    '''Файл для csv.writer, который возвращает строку вместо записи'''
+
+    def write(self, value):
+        return value
+
+
+def columns(kind, image_url=None):
+    names = list(COLUMNS[kind])
+    if kind == 'posts' and image_url is not None:
+        names.append('image')
+
+    return names
+
+
+def export_rows(kind, queryset, image_url=None):
+    '''Строки выгрузки по порядку id без создания моделей.
+
+    iterator() читает курсор порциями по EXPORT_CHUNK_SIZE, поэтому
+    память не растёт с числом строк. image_url(name) добавляет
+    к постам ссылку на картинку.
+    '''
+
+    names = columns(kind, image_url)
+    lookups = [COLUMNS[kind][name] for name in names if name != 'image']
+    if 'image' in names:
+        lookups.append('image')
+    rows = queryset.order_by('pk').values_list(*lookups).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE,
+    )
+    for values in rows:
+        row = dict(zip(names, values))
+        for name, value in row.items():
+            if hasattr(value, 'isoformat'):
+                row[name] = value.isoformat()
+        if 'image' in row:
+            row['image'] = image_url(row['image']) if row['image'] else ''
+        yield row
+
+
+def ndjson_lines(kind, rows):
+    for row in rows:
+        yield json.dumps({'type': kind, **row}, ensure_ascii=False) + '\n'
+
+
+def csv_lines(names, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def export_lines(fmt, kinds, image_url=None):
+    '''Строки файла выгрузки; kinds — пары (вид, queryset).
+
+    NDJSON помечает каждую запись полем type и может смешивать виды,
+    у CSV одна шапка, поэтому вид в нём один.
+    '''
+
+    for kind, queryset in kinds:
+        rows = export_rows(kind, queryset, image_url)
+        if fmt == 'csv':
+            yield from csv_lines(columns(kind, image_url), rows)
+        else:
+            yield from ndjson_lines(kind, rows)
+
+
+def storage_url(name):
+    return default_storage.url(name)
+
+
+def shard_ranges(kind, shards):
+    '''Делит id от минимального до максимального на shards отрезков'''
+
+    bounds = MODELS[kind].objects.order_by('pk').values_list('pk', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return []
+    width = -(-(last - first + 1) // shards)
+
+    return [
+        (start, min(start + width, last + 1))
+        for start in range(first, last + 1, width)
+    ]
+
+
+def export_shard(kind, fmt, start, stop, path, images=False):
+    '''Пишет в path строки с id из [start, stop), возвращает их число'''
+
+    queryset = MODELS[kind].objects.filter(pk__gte=start, pk__lt=stop)
+    image_url = storage_url if images else None
+    rows = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        for line in export_lines(fmt, [(kind, queryset)], image_url):
+            file.write(line)
+            rows += 1
+    if fmt == 'csv':
+        rows -= 1
+
+    return rows
+
+
+def export_shards(kind, fmt, directory, shards=1, workers=1, images=False):
+    '''Выгружает всю таблицу файлами по отрезкам id, параллельно.
+
+    Возвращает пары (путь, строк). Отрезки не пересекаются, поэтому
+    процессы читают базу независимо.
+    '''
+
+    extension = FORMATS[fmt][0]
+    jobs = [
+        (
+            kind,
+            fmt,
+            start,
+            stop,
+            os.path.join(directory, f'{kind}-{number:04d}.{extension}'),
+            images,
+        )
+        for number, (start, stop) in enumerate(shard_ranges(kind, shards))
+    ]
+    with process_pool(min(workers, len(jobs))) as pool:
+        if pool is None:
+            counts = [export_shard(*job) for job in jobs]
+        else:
+            counts = list(pool.map(export_shard, *zip(*jobs)))
+
+    return [(job[4], count) for job, count in zip(jobs, counts)]
@@ -0,0 +1,107 @@
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.routers import use_primary
+
+from . import caching
+from .constants import FOLLOW_GRAPH_TIMEOUT
+from .models import Follow
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+# (направление, чей список, кто в списке)
+DIRECTIONS = {
+    FOLLOWING: ('user_id', 'author_id'),
+    FOLLOWERS: ('author_id', 'user_id'),
+}
+KEY = 'follow_graph:{}:{}:{}'
+TYPECODE = 'q'
+
+
+def unpack(raw):
+    ids = array(TYPECODE)
+    ids.frombytes(raw)
+    return ids
+
+
+def key(direction, user_id):
+    generation, = caching.generations(caching.follow_graph_namespaces())
+    return KEY.format(generation, direction, user_id)
+
+
+def neighbours(direction, user_id):
+    '''Отсортированный массив id соседей пользователя.
+
+    Массив хранится в кеше байтами, 8 байт на id; промах читает
+    подписки из основной базы одним запросом по индексу: отставшая
+    реплика надолго оставила бы в кеше старый список.
+    '''
+
+    cache_key = key(direction, user_id)
+    raw = cache.get(cache_key)
+    if raw is not None:
+        return unpack(raw)
+    owner, other = DIRECTIONS[direction]
+    with use_primary():
+        ids = array(TYPECODE, Follow.objects.filter(
+            **{owner: user_id}
+        ).order_by(other).values_list(other, flat=True))
+    cache.set(cache_key, ids.tobytes(), FOLLOW_GRAPH_TIMEOUT)
+
+    return ids
+
+
+def contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def following(user_id):
+    '''id авторов, на которых подписан пользователь'''
+
+    return neighbours(FOLLOWING, user_id)
+
+
+def followers(author_id):
+    '''id подписчиков автора'''
+
+    return neighbours(FOLLOWERS, author_id)
+
+
+def is_following(user_id, author_id):
+    return contains(following(user_id), author_id)
+
+
+def following_count(user_id):
+    return len(following(user_id))
+
+
+def followers_count(author_id):
+    return len(followers(author_id))
+
+
+def following_among(user_id, author_ids):
+    '''Те из author_ids, на кого подписан пользователь: одно чтение
+    списка и двоичный поиск на каждого автора'''
+
+    ids = following(user_id)
+    return {author_id for author_id in author_ids if contains(ids, author_id)}
+
+
+def changed(user_id, *author_ids):
+    '''Подписки user_id на author_ids изменились.
+
+    Списки обоих направлений удаляются из кеша после коммита, и
+    следующее чтение возьмёт их из базы. Правка списка на месте внутри
+    транзакции оставила бы в кеше откатившуюся подписку.
+    '''
+
+    def forget():
+        cache.delete_many([key(FOLLOWING, user_id)] + [
+            key(FOLLOWERS, author_id) for author_id in author_ids
+        ])
+
+    transaction.on_commit(forget)
@@ -0,0 +1,79 @@
+from django.db import router, transaction
+
+from .models import Follow, User
+from .signals import followed
+
+
+def locked(alias, user_id):
+    '''Берёт блокировку строки подписчика до конца транзакции.
+
+    Подписки одного пользователя меняются по очереди, и вычисленный
+    в транзакции список авторов не устаревает до записи. На SQLite
+    то же даёт BEGIN IMMEDIATE, FOR UPDATE там не поддерживается.
+    '''
+
+    list(User.objects.using(alias).select_for_update().filter(
+        pk=user_id,
+    ).values_list('pk', flat=True))
+
+
+def follow(user_id, usernames):
+    '''Подписывает пользователя на авторов одним bulk_create.
+
+    В той же транзакции выбираются авторы, подписки на которых ещё
+    нет; уже существующие подписки пропускаются, поэтому повтор
+    безопасен. На себя подписаться нельзя, неизвестные имена
+    игнорируются. Возвращает id авторов, подписка на которых появилась.
+    '''
+
+    usernames = list(usernames)
+    if not usernames:
+        return []
+    alias = router.db_for_write(Follow)
+    with transaction.atomic(using=alias):
+        locked(alias, user_id)
+        author_ids = list(User.objects.using(alias).filter(
+            username__in=usernames,
+        ).exclude(
+            pk=user_id,
+        ).exclude(
+            following__user_id=user_id,
+        ).values_list('pk', flat=True))
+        if author_ids:
+            Follow.objects.using(alias).bulk_create(
+                (
+                    Follow(user_id=user_id, author_id=author_id)
+                    for author_id in author_ids
+                ),
+                ignore_conflicts=True,
+            )
+            # bulk_create не шлёт post_save: последствия применяются
+            # одним вызовом на всех авторов.
+            followed(user_id, author_ids)
+
+    return author_ids
+
+
+def unfollow(user_id, usernames):
+    '''Отписывает пользователя от авторов.
+
+    Повторная отписка ничего не меняет. Последствия применяет
+    сигнал post_delete каждой удалённой подписки. Возвращает id
+    авторов, подписка на которых была удалена.
+    '''
+
+    usernames = list(usernames)
+    if not usernames:
+        return []
+    alias = router.db_for_write(Follow)
+    with transaction.atomic(using=alias):
+        locked(alias, user_id)
+        subscriptions = Follow.objects.using(alias).filter(
+            user_id=user_id,
+            author__username__in=usernames,
+        )
+        author_ids = list(subscriptions.values_list('author_id', flat=True))
+        if author_ids:
+            subscriptions.delete()
+
+    return author_ids
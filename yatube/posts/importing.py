@@ -0,0 +1,375 @@
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users.forms import CreationForm
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post, User
+from .seeding import (
+    BATCH_SIZE,
+    explicit_dates,
+    last_id,
+    rebuild_derived,
+    reset_sequences,
+)
+
+# Порядок вставки внутри порции: ссылки идут на уже вставленное.
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+MODELS = {
+    'users': User,
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+DATE_FIELDS = {
+    'posts': ('pub_date',),
+    'comments': ('created',),
+}
+# Поля, по которым запись из повторённой порции узнаётся в базе.
+IDENTITY_FIELDS = {
+    'posts': ('author_id', 'text'),
+    'comments': ('post_id', 'author_id', 'text'),
+}
+MAX_ERRORS = 100
+# Сколько id за раз проверяется через pk__in.
+LOOKUP_CHUNK = 900
+
+
+def existing_rows(model, ids, *fields):
+    '''Словарь pk -> значения fields для уже сохранённых ids'''
+
+    ids = list(ids)
+    found = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        for pk, *values in model.objects.filter(
+            pk__in=ids[start:start + LOOKUP_CHUNK],
+        ).values_list('pk', *fields):
+            found[pk] = tuple(values)
+
+    return found
+
+
+def existing_ids(model, ids):
+    return set(existing_rows(model, ids))
+
+
+class Importer:
+    '''Проверяет записи дампа и вставляет их порциями bulk_create.
+
+    Правила полей берутся из полей PostForm, CommentForm и
+    CreationForm один раз, без формы на каждую строку. Авторы и
+    группы ищутся по словарям в памяти, новые пользователи и группы
+    получают id сразу. Посты и комментарии сохраняют свои id: запись,
+    чей id уже занят другой, отклоняется, а та же самая (повтор
+    порции после сбоя) пропускается. Счётчики — реально вставленные
+    строки.
+    '''
+
+    def __init__(self, counts=None, rejected=0, foreign=()):
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.next_ids = {
+            'users': last_id(User),
+            'groups': last_id(Group),
+        }
+        self.counts = counts or dict.fromkeys(KINDS, 0)
+        self.rejected = rejected
+        # id отклонённых постов: в базе под ними чужие посты, и
+        # комментарии к ним не должны к этим постам прицепиться.
+        self.foreign = set(foreign)
+        self.errors = []
+        self.pending = {kind: [] for kind in KINDS}
+        self.size = 0
+        self.password = make_password(None)
+        self.now = timezone.now()
+        self.rules = {
+            'username': CreationForm.base_fields['username'],
+            'post': PostForm.base_fields['text'],
+            'comment': CommentForm.base_fields['text'],
+            'slug': Group._meta.get_field('slug'),
+            'title': Group._meta.get_field('title'),
+        }
+
+    def reject(self, line, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            messages = getattr(error, 'messages', [str(error)])
+            self.errors.append((line, '; '.join(messages)))
+
+    def add(self, record, line):
+        '''Проверяет запись и ставит её объект в очередь порции'''
+
+        if not isinstance(record, dict) or record.get('type') not in KINDS:
+            raise ValidationError('Неизвестный тип записи')
+        kind = record['type']
+        obj = getattr(self, f'build_{kind}')(record)
+        if obj is not None:
+            obj._import_line = line
+            self.pending[kind].append(obj)
+            self.size += 1
+
+    def clean(self, rule, value):
+        field = self.rules[rule]
+        if hasattr(field, 'widget'):
+            return field.clean(value)
+        return field.clean(value, None)
+
+    def new_id(self, kind):
+        self.next_ids[kind] += 1
+        return self.next_ids[kind]
+
+    def user_id(self, username):
+        if username not in self.users:
+            raise ValidationError(f'Пользователь {username} не найден')
+        return self.users[username]
+
+    def date(self, value):
+        if not value:
+            return self.now
+        date = parse_datetime(value)
+        if date is None:
+            raise ValidationError(f'Некорректная дата {value}')
+        return date
+
+    def record_id(self, record, field='id'):
+        try:
+            return int(record[field])
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(f'Нет числового {field}')
+
+    def build_users(self, record):
+        username = self.clean('username', record.get('username'))
+        if username in self.users:
+            return None
+        self.users[username] = pk = self.new_id('users')
+
+        return User(
+            pk=pk,
+            username=username,
+            first_name=record.get('first_name', ''),
+            last_name=record.get('last_name', ''),
+            email=record.get('email', ''),
+            password=self.password,
+            date_joined=self.now,
+        )
+
+    def build_groups(self, record):
+        slug = self.clean('slug', record.get('slug'))
+        if slug in self.groups:
+            return None
+        title = self.clean('title', record.get('title'))
+        self.groups[slug] = pk = self.new_id('groups')
+
+        return Group(
+            pk=pk,
+            slug=slug,
+            title=title,
+            description=record.get('description', ''),
+        )
+
+    def build_posts(self, record):
+        group = record.get('group')
+        if group and group not in self.groups:
+            raise ValidationError(f'Группа {group} не найдена')
+
+        return Post(
+            pk=self.record_id(record),
+            text=self.clean('post', record.get('text')),
+            author_id=self.user_id(record.get('author')),
+            group_id=self.groups.get(group),
+            pub_date=self.date(record.get('pub_date')),
+            image=record.get('image') or '',
+        )
+
+    def build_comments(self, record):
+        return Comment(
+            pk=self.record_id(record),
+            post_id=self.record_id(record, 'post'),
+            author_id=self.user_id(record.get('author')),
+            text=self.clean('comment', record.get('text')),
+            created=self.date(record.get('created')),
+        )
+
+    def build_follows(self, record):
+        user_id = self.user_id(record.get('user'))
+        author_id = self.user_id(record.get('author'))
+        if user_id == author_id:
+            raise ValidationError('Нельзя подписаться на себя')
+
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def drop_collisions(self, kind):
+        '''Отклоняет записи, чей id занят другой записью в базе или
+        в порции; уже вставленная та же запись пропускается'''
+
+        fields = IDENTITY_FIELDS[kind]
+        objects = self.pending[kind]
+        stored = existing_rows(
+            MODELS[kind],
+            {obj.pk for obj in objects},
+            *fields,
+        )
+        self.pending[kind] = []
+        for obj in objects:
+            values = tuple(getattr(obj, name) for name in fields)
+            if obj.pk not in stored:
+                stored[obj.pk] = values
+                self.pending[kind].append(obj)
+            elif stored[obj.pk] != values:
+                if kind == 'posts':
+                    self.foreign.add(obj.pk)
+                self.reject(
+                    obj._import_line,
+                    ValidationError(f'id {obj.pk} занят другой записью'),
+                )
+
+    def drop_orphan_comments(self):
+        '''Отбрасывает комментарии к постам, которых нет ни в базе,
+        ни в текущей порции, и к отклонённым постам'''
+
+        comments = self.pending['comments']
+        post_ids = {comment.post_id for comment in comments} - self.foreign
+        known = post_ids & {post.pk for post in self.pending['posts']}
+        known |= existing_ids(Post, post_ids - known)
+        self.pending['comments'] = []
+        for comment in comments:
+            if comment.post_id in known:
+                self.pending['comments'].append(comment)
+            elif comment.post_id in self.foreign:
+                self.reject(
+                    comment._import_line,
+                    ValidationError(f'Пост {comment.post_id} отклонён'),
+                )
+            else:
+                self.reject(
+                    comment._import_line,
+                    ValidationError(f'Пост {comment.post_id} не найден'),
+                )
+
+    def drop_known_follows(self):
+        '''Убирает подписки, которые уже есть в базе или в порции'''
+
+        follows = self.pending['follows']
+        users = list({follow.user_id for follow in follows})
+        known = set()
+        for start in range(0, len(users), LOOKUP_CHUNK):
+            known.update(Follow.objects.filter(
+                user_id__in=users[start:start + LOOKUP_CHUNK],
+            ).values_list('user_id', 'author_id'))
+        self.pending['follows'] = []
+        for follow in follows:
+            pair = (follow.user_id, follow.author_id)
+            if pair not in known:
+                known.add(pair)
+                self.pending['follows'].append(follow)
+
+    def flush(self):
+        '''Вставляет порцию одной транзакцией'''
+
+        self.drop_collisions('posts')
+        self.drop_orphan_comments()
+        self.drop_collisions('comments')
+        self.drop_known_follows()
+        with transaction.atomic():
+            for kind in KINDS:
+                objects = self.pending[kind]
+                if not objects:
+                    continue
+                model = MODELS[kind]
+                with explicit_dates(*(
+                    model._meta.get_field(name)
+                    for name in DATE_FIELDS.get(kind, ())
+                )):
+                    model.objects.bulk_create(objects)
+                self.counts[kind] += len(objects)
+        self.pending = {kind: [] for kind in KINDS}
+        self.size = 0
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    return {}
+
+
+def save_checkpoint(path, state):
+    if not path:
+        return
+    # Замена через временный файл не оставляет полузаписанной отметки.
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(temporary, path)
+
+
+def import_dump(path, batch_size=BATCH_SIZE, checkpoint=None,
+                progress=None):
+    '''Загружает NDJSON-дамп, продолжая с отметки checkpoint.
+
+    Строки читаются по одной, каждые batch_size принятых записей
+    уходят в базу транзакцией, после неё в checkpoint пишется
+    смещение в файле. progress(строка, записей, секунд) вызывается
+    после каждой порции. В конце пересчитываются счётчики, ленты
+    и поиск. Возвращает отчёт со счётчиками и первыми ошибками.
+    '''
+
+    state = load_checkpoint(checkpoint)
+    importer = Importer(
+        state.get('counts'),
+        state.get('rejected', 0),
+        state.get('foreign', ()),
+    )
+    offset, line = state.get('offset', 0), state.get('line', 0)
+    started = time.perf_counter()
+
+    def commit():
+        importer.flush()
+        save_checkpoint(checkpoint, {
+            'offset': offset,
+            'line': line,
+            'counts': importer.counts,
+            'rejected': importer.rejected,
+            'foreign': sorted(importer.foreign),
+        })
+        if progress:
+            progress(
+                line,
+                sum(importer.counts.values()),
+                time.perf_counter() - started,
+            )
+
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        for raw in file:
+            offset += len(raw)
+            line += 1
+            if not raw.strip():
+                continue
+            try:
+                importer.add(json.loads(raw), line)
+            except (ValueError, ValidationError) as error:
+                importer.reject(line, error)
+            if importer.size >= batch_size:
+                commit()
+        commit()
+
+    reset_sequences(User, Group, Post, Comment)
+    rebuild_derived()
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    return {
+        'counts': importer.counts,
+        'rejected': importer.rejected,
+        'errors': importer.errors,
+        'lines': line,
+        'seconds': time.perf_counter() - started,
+    }
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.benchmarks import follow_paths
+from posts.models import User
+from posts.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает прежнюю подписку через exists() и create() с вызовом '
+        'posts.follows на каждого автора и с массовой подпиской'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help='Файл JSON для результатов',
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            seed_dataset(
+                users=options['users'],
+                posts=options['posts'],
+                seed=options['seed'],
+            )
+            usernames = list(User.objects.order_by('pk').values_list(
+                'username',
+                flat=True,
+            )[:options['authors']])
+            reader = User.objects.create_user(username='benchmark_reader')
+            results = follow_paths(reader, usernames, options['rounds'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<10} '
+                f'{result["ms_per_operation"]:8.3f} мс  '
+                f'{result["queries_per_operation"]:6.2f} запросов '
+                'на подписку или отписку'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты записаны в {options["output"]}'
+            ))
@@ -0,0 +1,105 @@
+import json
+import logging
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.benchmarks import Targets, server_throughput
+from posts.seeding import seed_dataset
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI под одновременными '
+        'клиентами, с параллельными чтениями во view и без них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            action='append',
+            help='Число клиентов, можно несколько раз; по умолчанию 1 и 16',
+        )
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument(
+            '--query-workers',
+            type=int,
+            default=4,
+            help='QUERY_WORKERS для прогона с параллельными чтениями',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл JSON для результатов',
+        )
+
+    def urls(self, seed, count=50):
+        targets = Targets(random.Random(seed))
+        urls = []
+        for number in range(count):
+            urls.append((
+                reverse('posts:group_list', args=[targets.slug()]),
+                reverse('posts:profile', args=[targets.username()]),
+                reverse('posts:post_detail', args=[targets.post_id()]),
+            )[number % 3])
+
+        return urls
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or [1, 16]
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        logging.getLogger('core.middleware').setLevel(logging.ERROR)
+        results = {}
+        try:
+            seed_dataset(**{
+                name: options[name]
+                for name in (
+                    'users', 'groups', 'posts', 'comments', 'follows', 'seed',
+                )
+            })
+            urls = self.urls(options['seed'])
+            # Страницы не кешируются: сравнивается работа с базой.
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            }}):
+                for clients in concurrency:
+                    for workers in (0, options['query_workers']):
+                        for mode in MODES:
+                            with override_settings(QUERY_WORKERS=workers):
+                                result = server_throughput(
+                                    mode,
+                                    urls,
+                                    concurrency=clients,
+                                    requests=options['requests'],
+                                )
+                            name = f'{mode}-c{clients}-q{workers}'
+                            results[name] = result
+                            self.stdout.write(
+                                f'{name:<14} '
+                                f'{result["requests_per_second"]:8.1f} '
+                                f'запросов/с  '
+                                f'p50 {result["p50_ms"]:7.2f} мс  '
+                                f'p95 {result["p95_ms"]:7.2f} мс  '
+                                f'ошибок {result["errors"]}'
+                            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты записаны в {options["output"]}'
+            ))
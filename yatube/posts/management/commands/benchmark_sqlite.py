@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.benchmarks import concurrent_throughput
+from posts.models import Group, Post, User
+
+ENGINES = {
+    'stock': 'django.db.backends.sqlite3',
+    'tuned': 'core.db.backends.sqlite3',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтения и записи в секунду у стандартного sqlite3 '
+        'и настроенного core.db.backends.sqlite3 под параллельной записью'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=1)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=1000,
+            help='Сколько постов в базе до замера',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл JSON для результатов',
+        )
+
+    def prepare(self, alias, posts):
+        connection = connections[alias]
+        with connection.schema_editor() as editor:
+            for model in (User, Group, Post):
+                editor.create_model(model)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {User._meta.db_table} (id, password, '
+                'is_superuser, username, first_name, last_name, email, '
+                'is_staff, is_active, date_joined) '
+                "VALUES (1, '', 0, 'author', '', '', '', 0, 1, "
+                'CURRENT_TIMESTAMP)'
+            )
+            cursor.executemany(
+                f'INSERT INTO {Post._meta.db_table} (text, pub_date, '
+                'updated, author_id, image, image_variants, comments_count) '
+                "VALUES (%s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1, '', "
+                '0, 0)',
+                [[f'Пост {number}'] for number in range(posts)],
+            )
+
+    def handle(self, *args, **options):
+        load = {
+            name: options[name]
+            for name in ('readers', 'writers', 'seconds', 'posts')
+        }
+        results = {}
+        # Каждый движок получает свой файл: у WAL журнал хранится
+        # в самой базе и остался бы у следующего прогона.
+        with tempfile.TemporaryDirectory() as directory:
+            for name, engine in ENGINES.items():
+                alias = f'benchmark_{name}'
+                connections.databases[alias] = {
+                    **connections.databases[DEFAULT_DB_ALIAS],
+                    'ENGINE': engine,
+                    'NAME': os.path.join(directory, f'{name}.sqlite3'),
+                    'OPTIONS': {},
+                    'TEST': {},
+                }
+                connections.ensure_defaults(alias)
+                try:
+                    self.prepare(alias, options['posts'])
+                    connections[alias].close()
+                    results[name] = concurrent_throughput(
+                        alias,
+                        readers=options['readers'],
+                        writers=options['writers'],
+                        seconds=options['seconds'],
+                    )
+                finally:
+                    connections[alias].close()
+                    del connections.databases[alias]
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<6} чтений/с {result["reads_per_second"]:9.1f}  '
+                f'записей/с {result["writes_per_second"]:8.1f}  '
+                f'ошибок {result["errors"]}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'load': load, 'results': results},
+                    file,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты записаны в {options["output"]}'
+            ))
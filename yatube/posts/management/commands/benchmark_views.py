@@ -0,0 +1,129 @@
+import json
+import logging
+import subprocess
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts.benchmarks import compare, run_benchmarks, scenarios
+from posts.seeding import seed_dataset
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет тестовую базу и меряет задержку, запросы и память '
+        'страниц постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Сколько подписок в среднем у пользователя',
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=0,
+            help='Сколько постов получат картинки-заглушки',
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(scenarios()),
+            help='Запустить только эти сценарии',
+        )
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help='Не чистить кеш между запросами',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл JSON для результатов',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона для сравнения',
+        )
+
+    def handle(self, *args, **options):
+        dataset = {
+            name: options[name]
+            for name in (
+                'users', 'groups', 'posts', 'comments', 'follows', 'images',
+                'seed',
+            )
+        }
+        # Замеры идут в отдельной тестовой базе и временном MEDIA_ROOT,
+        # рабочие данные не трогаются.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # Запросы считаются здесь же, предупреждения middleware лишние.
+        logging.getLogger('core.middleware').setLevel(logging.ERROR)
+        try:
+            with tempfile.TemporaryDirectory() as media, override_settings(
+                MEDIA_ROOT=media,
+            ):
+                seed_dataset(**dataset)
+                results = run_benchmarks(
+                    iterations=options['iterations'],
+                    names=options['scenario'],
+                    seed=options['seed'],
+                    cached=options['cached'],
+                    images=bool(options['images']),
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'dataset': dataset,
+            'cached': options['cached'],
+            'results': results,
+        }
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<14} p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'p99 {result["p99_ms"]:8.2f} мс  '
+                f'запросов {result["queries"]:5.1f}  '
+                f'память {result["peak_memory_kb"]:8.1f} КБ'
+            )
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+            for name, change in compare(baseline, results).items():
+                self.stdout.write(
+                    f'{name:<14} p95 {change["p95_ms"]:+.1%}  '
+                    f'запросов {change["queries"]:+.1f}'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты записаны в {options["output"]}'
+            ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import caching
+
+PAGES = (
+    'index_page',
+    'group_page',
+    'profile_page',
+    'trending_page',
+    'group_trending_page',
+)
+
+
+class Command(BaseCommand):
+    help = 'Доли попаданий, промахов и устаревших ответов кеша страниц'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Префиксы кеша, по умолчанию все страницы',
+        )
+
+    def handle(self, *args, **options):
+        if not caching.shared():
+            # Команда идёт отдельным процессом и увидела бы свой
+            # пустой кеш, а не счётчики сервера.
+            raise CommandError(
+                'Кеш default у каждого процесса свой; для счётчиков '
+                'нужен общий бэкенд CACHES (Memcached, Redis, база)'
+            )
+        report = caching.metrics(*(options['names'] or PAGES))
+        for name, counts in report.items():
+            rates = '  '.join(
+                f'{outcome} {counts[f"{outcome}_rate"]:6.1%}'
+                for outcome in caching.OUTCOMES
+            )
+            self.stdout.write(f'{name:<20} {counts["total"]:>8}  {rates}')
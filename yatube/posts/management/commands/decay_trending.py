@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Сдвигает момент отсчёта весов трендов и убирает остывшие '
+        'посты; запускается по расписанию'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пересчитать тренды с нуля по постам и комментариям',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = trending.rebuild()
+        else:
+            count = trending.decay()
+        self.stdout.write(self.style.SUCCESS(f'Постов в трендах: {count}'))
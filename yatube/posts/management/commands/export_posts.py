@@ -0,0 +1,84 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.concurrent import add_workers_argument
+
+from posts.exports import (
+    FORMATS,
+    MODELS,
+    export_lines,
+    export_shards,
+    storage_url,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты или комментарии в NDJSON или CSV построчно, '
+        'всю базу — параллельно по отрезкам id'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(MODELS))
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATS),
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--author',
+            help='Выгрузить только записи этого пользователя в stdout',
+        )
+        parser.add_argument(
+            '--images',
+            action='store_true',
+            help='Добавить к постам ссылки на картинки',
+        )
+        parser.add_argument(
+            '--output',
+            help='Каталог для файлов отрезков; без него — stdout',
+        )
+        parser.add_argument('--shards', type=int, default=1)
+        add_workers_argument(parser)
+
+    def handle(self, *args, **options):
+        kind, fmt = options['kind'], options['format']
+        image_url = storage_url if options['images'] else None
+        if options['output'] is None:
+            queryset = MODELS[kind].objects.all()
+            if options['author']:
+                author = get_user_model().objects.filter(
+                    username=options['author'],
+                ).first()
+                if author is None:
+                    raise CommandError(
+                        f'Пользователь {options["author"]} не найден'
+                    )
+                queryset = queryset.filter(author=author)
+            for line in export_lines(fmt, [(kind, queryset)], image_url):
+                self.stdout.write(line, ending='')
+            return
+
+        if options['author']:
+            raise CommandError('--author выгружается только в stdout')
+        os.makedirs(options['output'], exist_ok=True)
+        started = time.perf_counter()
+        files = export_shards(
+            kind,
+            fmt,
+            options['output'],
+            shards=max(options['shards'], 1),
+            workers=options['workers'],
+            images=options['images'],
+        )
+        seconds = time.perf_counter() - started
+        for path, rows in files:
+            self.stdout.write(f'{path}: {rows} строк')
+        rows = sum(rows for _, rows in files)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {rows} за {seconds:.1f} с, '
+            f'{rows / seconds if seconds else 0:.0f} строк/с'
+        ))
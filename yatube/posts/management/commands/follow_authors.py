@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import follows
+from posts.constants import FOLLOW_BULK_LIMIT
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Подписывает пользователя на авторов или отписывает от них'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Кого подписывать')
+        parser.add_argument('authors', nargs='*', help='Имена авторов')
+        parser.add_argument(
+            '--file',
+            help='Файл с именами авторов, по одному в строке',
+        )
+        parser.add_argument(
+            '--unfollow',
+            action='store_true',
+            help='Отписать вместо подписки',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        authors = list(options['authors'])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as lines:
+                authors.extend(line.strip() for line in lines if line.strip())
+        apply = follows.unfollow if options['unfollow'] else follows.follow
+        changed = 0
+        # Одна транзакция на всё, запросы по FOLLOW_BULK_LIMIT имён.
+        with transaction.atomic():
+            for start in range(0, len(authors), FOLLOW_BULK_LIMIT):
+                changed += len(apply(
+                    user.pk,
+                    authors[start:start + FOLLOW_BULK_LIMIT],
+                ))
+        action = 'Удалено' if options['unfollow'] else 'Создано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} подписок: {changed} из {len(authors)}'
+        ))
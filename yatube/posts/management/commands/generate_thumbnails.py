@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.concurrent import add_workers_argument, process_pool
+from posts.models import Post
+from posts.thumbnails import generate_missing
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок постов на всех ядрах'
+
+    def add_arguments(self, parser):
+        add_workers_argument(parser)
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Сколько картинок отдавать процессу за раз',
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='').values_list('image', flat=True)
+        )
+        with process_pool(options['workers']) as pool:
+            if pool is None:
+                created = sum(map(generate_missing, names))
+            else:
+                created = sum(pool.map(
+                    generate_missing,
+                    names,
+                    chunksize=options['chunk_size'],
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(names)}, создано миниатюр: {created}'
+        ))
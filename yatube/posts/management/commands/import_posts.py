@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importing import import_dump
+from posts.seeding import BATCH_SIZE
+
+PROGRESS_INTERVAL = 1.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пользователей, группы, посты, комментарии и подписки '
+        'из NDJSON-дампа с продолжением после сбоя'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON, по записи с type в строке')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Записей в одной транзакции',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл отметки, по умолчанию <path>.checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, забыв отметку',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        if options['restart'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elif os.path.exists(checkpoint):
+            self.stdout.write(f'Продолжение с отметки {checkpoint}')
+        reported = time.perf_counter()
+
+        def progress(line, rows, seconds):
+            nonlocal reported
+            if time.perf_counter() - reported < PROGRESS_INTERVAL:
+                return
+            reported = time.perf_counter()
+            self.stdout.write(
+                f'строка {line:>10}, записей {rows:>10}, '
+                f'{rows / seconds if seconds else 0:10.0f} записей/с'
+            )
+
+        report = import_dump(
+            path,
+            batch_size=options['batch_size'],
+            checkpoint=checkpoint,
+            progress=progress,
+        )
+        for kind, rows in report['counts'].items():
+            self.stdout.write(f'{kind:<9} {rows:>10}')
+        for line, message in report['errors']:
+            self.stderr.write(f'строка {line}: {message}')
+        rows = sum(report['counts'].values())
+        seconds = report['seconds']
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {rows}, отклонено: {report["rejected"]} '
+            f'за {seconds:.1f} с, {rows / seconds if seconds else 0:.0f} '
+            'записей/с'
+        ))
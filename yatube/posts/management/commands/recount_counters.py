@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if not dry_run:
+            counters.create_missing_stats()
+        drift = counters.recount(dry_run=dry_run)
+        for counter, stale in drift.items():
+            self.stdout.write(f'{counter}: расхождений {stale}')
+        if not dry_run:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
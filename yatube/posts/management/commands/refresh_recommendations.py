@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+from posts.constants import RECOMMENDATION_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации авторов для пользователей, чьи '
+        'подписки или подписки их подписок изменились'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать всех: близость по совместным подпискам '
+                 'меняется и у тех, кто не отмечен',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECOMMENDATION_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        count = recommendations.refresh(
+            full=options['full'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {count} пользователей'
+        ))
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.concurrent import add_workers_argument
+
+from posts.seeding import BATCH_SIZE, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, постами, '
+        'подписками и комментариями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=50,
+            help='Сколько подписок в среднем у пользователя',
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=0,
+            help='Сколько постов получат картинки-заглушки',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Строк в одной порции bulk_create',
+        )
+        add_workers_argument(parser)
+
+    def progress(self, phase, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(
+            f'{phase:<9} {rows:>10} строк за {seconds:7.2f} с, '
+            f'{rate:10.0f} строк/с'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed_dataset(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            progress=self.progress,
+        )
+        seconds = time.perf_counter() - started
+        rows = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {rows} за {seconds:.1f} с, '
+            f'{rows / seconds:.0f} строк/с'
+        ))
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+# (модель, счётчик, модель-источник, поле связи, поле модели для связи)
+COUNTERS = (
+    ('Group', 'posts_count', 'Post', 'group', 'pk'),
+    ('Post', 'comments_count', 'Comment', 'post', 'pk'),
+    ('AuthorStats', 'posts_count', 'Post', 'author', 'user'),
+    ('AuthorStats', 'followers_count', 'Follow', 'author', 'user'),
+    ('AuthorStats', 'following_count', 'Follow', 'user', 'user'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    # Своя копия заполнения, а не posts.counters: миграция работает
+    # с историческими моделями и не должна меняться вместе с кодом.
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    stats = apps.get_model('posts', 'AuthorStats')
+    stats.objects.bulk_create(
+        (
+            stats(user_id=pk)
+            for pk in user_model.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500,
+    )
+    for name, field, source, link, outer in COUNTERS:
+        counted = apps.get_model('posts', source).objects.filter(
+            **{link: OuterRef(outer)}
+        ).order_by().values(link).annotate(
+            total=Count('pk'),
+        ).values('total')
+        apps.get_model('posts', name).objects.update(
+            **{field: Coalesce(Subquery(counted), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число комментариев'),
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='число подписок')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'счётчики автора',
+                'verbose_name_plural': 'счётчики авторов',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def reset_variants(apps, schema_editor):
+    # Варианты переехали под полное имя оригинала: прежние файлы
+    # больше не находятся, их заново нарежет generate_thumbnails.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.exclude(image='').update(image_variants=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_trending_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_variants, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from posts.constants import NUMBER_OF_CHARACTERS_IN_POST_TITLE
@@ -12,6 +13,7 @@ class Group(models.Model):
     title = models.CharField('Название группы', max_length=200)
     slug = models.SlugField('имя для перехода', unique=True)
     description = models.TextField('описание группы')
+    posts_count = models.PositiveIntegerField('число постов', default=0)
 
     class Meta:
         verbose_name = 'группа'
@@ -27,6 +29,7 @@ class Post(models.Model):
 
     text = models.TextField('сообщение поста', help_text='Введите текст поста')
     pub_date = models.DateTimeField('дата', auto_now_add=True)
+    updated = models.DateTimeField('дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -47,11 +50,38 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    image_variants = models.BooleanField(
+        'размеры картинки готовы',
+        default=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'число комментариев',
+        default=0,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
+        # Индексы повторяют порядок курсора (дата, id) каждой ленты.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_feed_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'),
+            # Последняя правка автора и группы для ETag страниц.
+            models.Index(
+                fields=['author', '-updated'],
+                name='post_author_updated_idx'),
+            models.Index(
+                fields=['group', '-updated'],
+                name='post_group_updated_idx'),
+        ]
 
     def __str__(self) -> str:
         '''Выводит название группы'''
@@ -81,6 +111,11 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_page_idx'),
+        ]
 
     def __str__(self) -> str:
         '''Выводит сообщение комментария'''
@@ -109,3 +144,139 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='unique_booking'),
         ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются при записи"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='пользователь',
+    )
+    posts_count = models.PositiveIntegerField('число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'число подписок',
+        default=0,
+    )
+    recommendations_stale = models.BooleanField(
+        'рекомендации устарели',
+        default=True,
+    )
+
+    class Meta:
+        verbose_name = 'счётчики автора'
+        verbose_name_plural = 'счётчики авторов'
+
+    def __str__(self) -> str:
+        '''Выводит имя пользователя'''
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная подписчику при публикации"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор поста',
+    )
+    pub_date = models.DateTimeField('дата поста')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_feed_idx'),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_author_idx'),
+        ]
+
+
+class Recommendation(models.Model):
+    """Автор, которого фоновое задание советует пользователю"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='рекомендованный автор',
+    )
+    rank = models.PositiveSmallIntegerField('место')
+    score = models.FloatField('вес')
+    computed = models.DateTimeField('посчитано', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'рекомендация'
+        verbose_name_plural = 'рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'],
+                name='unique_recommendation_rank'),
+        ]
+
+
+class TrendingPost(models.Model):
+    """Вес поста в трендах относительно общего момента отсчёта"""
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='пост',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='группа поста',
+    )
+    score = models.FloatField('вес')
+    decayed_at = models.DateTimeField('момент отсчёта')
+
+    class Meta:
+        verbose_name = 'пост в трендах'
+        verbose_name_plural = 'посты в трендах'
+        indexes = [
+            models.Index(
+                fields=['-score'],
+                name='trending_score_idx'),
+            models.Index(
+                fields=['group', '-score'],
+                name='trending_group_idx'),
+        ]
@@ -0,0 +1,198 @@
+from array import array
+from collections import defaultdict
+from heapq import nlargest
+import math
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import caching
+from .constants import (
+    RECOMMENDATION_BATCH_SIZE,
+    RECOMMENDATION_FOLLOWER_SAMPLE,
+    RECOMMENDATION_SIMILAR_AUTHORS,
+    RECOMMENDATIONS_PER_USER,
+)
+from .models import AuthorStats, Follow, Recommendation
+
+# Вес общего знакомого против совместной подписки.
+FRIEND_OF_FRIEND_WEIGHT = 1.0
+COFOLLOW_WEIGHT = 1.0
+
+
+def adjacency(pairs):
+    '''Строки разреженной матрицы: id -> отсортированный array id'''
+
+    rows = defaultdict(lambda: array('q'))
+    for row, column in pairs:
+        rows[row].append(column)
+
+    return dict(rows)
+
+
+class FollowMatrix:
+    '''Весь граф подписок в памяти: строки подписок и подписчиков.
+
+    Строки — отсортированные array('q') по 8 байт на ребро, как
+    в follow_graph; граф читается двумя проходами по индексам Follow.
+    '''
+
+    def __init__(self, following, followers):
+        self.following = following
+        self.followers = followers
+        self._similar = {}
+        self._popular = None
+
+    @classmethod
+    def load(cls):
+        edges = Follow.objects.all()
+
+        return cls(
+            adjacency(edges.order_by('user_id', 'author_id').values_list(
+                'user_id',
+                'author_id',
+            ).iterator()),
+            adjacency(edges.order_by('author_id', 'user_id').values_list(
+                'author_id',
+                'user_id',
+            ).iterator()),
+        )
+
+    def row(self, rows, key):
+        return rows.get(key, ())
+
+    def similar(self, author_id):
+        '''Авторы, на которых подписываются вместе с author_id.
+
+        Косинусная близость по общим подписчикам; у популярных
+        авторов берутся первые RECOMMENDATION_FOLLOWER_SAMPLE из них.
+        '''
+
+        if author_id in self._similar:
+            return self._similar[author_id]
+        followers = self.row(self.followers, author_id)
+        together = defaultdict(int)
+        for follower in followers[:RECOMMENDATION_FOLLOWER_SAMPLE]:
+            for other in self.row(self.following, follower):
+                together[other] += 1
+        together.pop(author_id, None)
+        similar = nlargest(
+            RECOMMENDATION_SIMILAR_AUTHORS,
+            (
+                (count / math.sqrt(
+                    len(followers) * len(self.row(self.followers, other))
+                ), other)
+                for other, count in together.items()
+            ),
+        )
+        self._similar[author_id] = similar
+
+        return similar
+
+    def popular(self):
+        '''Авторы с наибольшим числом подписчиков'''
+
+        if self._popular is None:
+            self._popular = nlargest(
+                RECOMMENDATIONS_PER_USER * 2,
+                ((len(ids), author) for author, ids in self.followers.items()),
+            )
+
+        return self._popular
+
+    def recommend(self, user_id, limit=RECOMMENDATIONS_PER_USER):
+        '''Лучшие (вес, id автора) для пользователя.
+
+        Вес — сколько подписок пользователя читают автора плюс
+        близость автора к его подпискам; свободные места занимают
+        популярные авторы с весом 0.
+        '''
+
+        following = self.row(self.following, user_id)
+        scores = defaultdict(float)
+        for author in following:
+            for other in self.row(self.following, author):
+                scores[other] += FRIEND_OF_FRIEND_WEIGHT
+            for similarity, other in self.similar(author):
+                scores[other] += COFOLLOW_WEIGHT * similarity
+        known = set(following)
+        known.add(user_id)
+        best = nlargest(
+            limit,
+            (
+                (score, author)
+                for author, score in scores.items()
+                if author not in known
+            ),
+        )
+        chosen = {author for _, author in best}
+        for _, author in self.popular():
+            if len(best) >= limit:
+                break
+            if author not in known and author not in chosen:
+                best.append((0.0, author))
+
+        return best
+
+
+def mark_stale(user_id):
+    '''Подписки user_id изменились: пересчитать его и его подписчиков'''
+
+    AuthorStats.objects.filter(
+        Q(user_id=user_id)
+        | Q(user_id__in=Follow.objects.filter(
+            author_id=user_id,
+        ).values('user_id')),
+    ).update(recommendations_stale=True)
+
+
+def refresh(full=False, batch_size=RECOMMENDATION_BATCH_SIZE):
+    '''Пересчитывает рекомендации устаревших пользователей.
+
+    Граф читается целиком один раз, записи идут пачками по
+    batch_size пользователей. Флаги всех выбранных снимаются до
+    чтения графа, так что подписка, которую граф не увидел, снова
+    пометит пользователя. Возвращает число пересчитанных.
+    '''
+
+    stats = AuthorStats.objects.order_by('user_id')
+    if not full:
+        stats = stats.filter(recommendations_stale=True)
+    users = list(stats.values_list('user_id', flat=True))
+    for start in range(0, len(users), batch_size):
+        AuthorStats.objects.filter(
+            user_id__in=users[start:start + batch_size],
+        ).update(recommendations_stale=False)
+    matrix = FollowMatrix.load()
+    for start in range(0, len(users), batch_size):
+        user_ids = users[start:start + batch_size]
+        rows = [
+            Recommendation(
+                user_id=user_id,
+                author_id=author_id,
+                rank=rank,
+                score=score,
+            )
+            for user_id in user_ids
+            for rank, (score, author_id) in enumerate(
+                matrix.recommend(user_id),
+            )
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=user_ids).delete()
+            Recommendation.objects.bulk_create(rows, batch_size=batch_size)
+        caching.bump(*(
+            namespace
+            for user_id in user_ids
+            for namespace in caching.profile_namespaces(user_id)
+        ))
+
+    return len(users)
+
+
+def for_user(user_id):
+    '''Рекомендации пользователя одним чтением по индексу (user, rank)'''
+
+    return list(Recommendation.objects.filter(
+        user_id=user_id,
+    ).select_related('author').order_by('rank'))
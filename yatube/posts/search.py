@@ -0,0 +1,238 @@
+from abc import ABC, abstractmethod
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .utils import BACKWARD, FORWARD, CursorPaginator
+
+WORD_RE = re.compile(r'\w+')
+# Бэкенд по умолчанию для базы: таблицу FTS5 миграция 0012 создаёт
+# только на SQLite, остальные базы ищут через LIKE.
+VENDOR_BACKENDS = {'sqlite': 'posts.search.SqliteSearchBackend'}
+FALLBACK_BACKEND = 'posts.search.SimpleSearchBackend'
+
+
+class SearchBackend(ABC):
+    '''Интерфейс поискового индекса постов.
+
+    search() возвращает пары (rank, post_id) по возрастанию rank,
+    меньший rank означает лучшее совпадение.
+    '''
+
+    @abstractmethod
+    def index_posts(self, post_ids):
+        '''Обновляет записи индекса для постов'''
+
+    @abstractmethod
+    def index_group(self, group_id):
+        '''Обновляет записи индекса для постов группы'''
+
+    @abstractmethod
+    def remove_posts(self, post_ids):
+        '''Убирает посты из индекса'''
+
+    @abstractmethod
+    def rebuild(self):
+        '''Строит индекс заново'''
+
+    @abstractmethod
+    def search(self, query, position=None, limit=10):
+        '''До limit пар (rank, post_id) после позиции курсора'''
+
+    @abstractmethod
+    def filter(self, queryset, query):
+        '''Ограничивает queryset постов совпадениями с запросом'''
+
+
+class SimpleSearchBackend(SearchBackend):
+    '''Поиск через icontains для баз без полнотекстового индекса'''
+
+    # Индекса нет: запросы идут прямо по таблицам постов и групп.
+
+    def index_posts(self, post_ids):
+        pass
+
+    def index_group(self, group_id):
+        pass
+
+    def remove_posts(self, post_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def matches(self, query):
+        condition = Q()
+        for word in WORD_RE.findall(query):
+            condition &= (
+                Q(text__icontains=word)
+                | Q(group__title__icontains=word)
+            )
+
+        return condition
+
+    def search(self, query, position=None, limit=10):
+        if not WORD_RE.search(query):
+            return []
+        posts = Post.objects.filter(self.matches(query))
+        if position is None or position[0] == FORWARD:
+            if position is not None:
+                posts = posts.filter(pk__gt=position[2])
+            posts = posts.order_by('pk')
+        else:
+            posts = posts.filter(pk__lt=position[2]).order_by('-pk')
+
+        return [
+            (0.0, pk) for pk in posts.values_list('pk', flat=True)[:limit]
+        ]
+
+    def filter(self, queryset, query):
+        return queryset.filter(self.matches(query))
+
+
+class SqliteSearchBackend(SearchBackend):
+    '''Инвертированный индекс на SQLite FTS5, rowid записи равен id поста'''
+
+    table = 'posts_search'
+    rank = 'bm25(posts_search, 1.0, 0.5)'
+    source = (
+        'SELECT p.id, p.text, COALESCE(g.title, \'\') '
+        'FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id'
+    )
+
+    def match_expression(self, query):
+        # Слова пользователя экранируются, чтобы не разбирались как
+        # синтаксис FTS5; каждое слово ищется по префиксу.
+        words = WORD_RE.findall(query)
+
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def _execute(self, sql, params=(), read=False):
+        # Индекс пишется в основную базу, поиск читает через роутер.
+        alias = (router.db_for_read if read else router.db_for_write)(Post)
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def _placeholders(self, values):
+        return ', '.join(['%s'] * len(values))
+
+    def index_posts(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        self.remove_posts(post_ids)
+        self._execute(
+            f'INSERT INTO {self.table}(rowid, text, group_title) '
+            f'{self.source} WHERE p.id IN ({self._placeholders(post_ids)})',
+            post_ids,
+        )
+
+    def index_group(self, group_id):
+        self._execute(
+            f'INSERT OR REPLACE INTO {self.table}(rowid, text, group_title) '
+            f'{self.source} WHERE p.group_id = %s',
+            [group_id],
+        )
+
+    def remove_posts(self, post_ids):
+        post_ids = list(post_ids)
+        if post_ids:
+            self._execute(
+                f'DELETE FROM {self.table} '
+                f'WHERE rowid IN ({self._placeholders(post_ids)})',
+                post_ids,
+            )
+
+    def rebuild(self):
+        self._execute(f'DELETE FROM {self.table}')
+        self._execute(
+            f'INSERT INTO {self.table}(rowid, text, group_title) '
+            f'{self.source}'
+        )
+        self._execute(
+            f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')"
+        )
+
+    def search(self, query, position=None, limit=10):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        sql = (
+            f'SELECT {self.rank} AS score, rowid FROM {self.table} '
+            f'WHERE {self.table} MATCH %s'
+        )
+        params = [expression]
+        if position is None:
+            order = 'score, rowid'
+        else:
+            direction, rank, pk = position
+            sign, order = '>', 'score, rowid'
+            if direction == BACKWARD:
+                sign, order = '<', 'score DESC, rowid DESC'
+            sql += (
+                f' AND ({self.rank} {sign} %s '
+                f'OR ({self.rank} = %s AND rowid {sign} %s))'
+            )
+            params += [rank, rank, pk]
+        sql += f' ORDER BY {order} LIMIT %s'
+
+        return self._execute(sql, params + [limit], read=True)
+
+    def filter(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+
+        return queryset.extra(
+            where=[
+                f'posts_post.id IN (SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s)'
+            ],
+            params=[expression],
+        )
+
+
+def get_backend():
+    '''POSTS_SEARCH_BACKEND или бэкенд, подходящий базе постов'''
+
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path is None:
+        vendor = connections[router.db_for_write(Post)].vendor
+        path = VENDOR_BACKENDS.get(vendor, FALLBACK_BACKEND)
+
+    return import_string(path)()
+
+
+backend = SimpleLazyObject(get_backend)
+
+
+class SearchPaginator(CursorPaginator):
+    '''Курсор по (rank, id) поверх результатов поискового индекса'''
+
+    parse_key = float
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.none(), per_page)
+        self.query = query
+
+    def cursor_key(self, obj):
+        return obj.search_rank
+
+    def fetch(self, position, limit):
+        hits = backend.search(self.query, position, limit)
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for rank, pk in hits]
+        )
+        found = []
+        for rank, pk in hits:
+            if pk in posts:
+                posts[pk].search_rank = rank
+                found.append(posts[pk])
+
+        return found
@@ -0,0 +1,360 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from core.concurrent import process_pool
+
+from . import caching, counters, timeline, trending
+from .models import (
+    AuthorStats,
+    Comment,
+    Follow,
+    Group,
+    Post,
+    TimelineEntry,
+    User,
+)
+from .search import backend as search_backend
+
+PASSWORD = 'yatube'
+WORDS = (
+    'утро', 'город', 'кофе', 'книга', 'дорога', 'море', 'осень', 'музыка',
+    'работа', 'друзья', 'кино', 'поезд', 'снег', 'лето', 'код', 'кот',
+    'река', 'горы', 'вечер', 'новости', 'спорт', 'история', 'сад', 'дом',
+)
+BATCH_SIZE = 1000
+ZIPF_EXPONENT = 1.1
+
+# Параметры генерации текущего процесса: id пользователей, постов и т.д.
+_context = {}
+
+
+def zipf_weights(size, exponent=ZIPF_EXPONENT):
+    '''Накопленные веса степенного закона: первые элементы популярнее'''
+
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def last_id(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def reset_sequences(*models):
+    '''Сдвигает автоинкремент за id, выданные генератором'''
+
+    sql = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for statement in sql:
+            cursor.execute(statement)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    '''Выключает auto_now_add, чтобы даты задавал генератор'''
+
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def placeholder_image(rng, number):
+    '''Однотонная картинка-заглушка в хранилище медиа'''
+
+    color = tuple(rng.randrange(256) for _ in range(3))
+    buffer = BytesIO()
+    Image.new('RGB', (640, 360), color).save(buffer, 'JPEG')
+
+    return default_storage.save(
+        f'posts/seed_{number}.jpg',
+        ContentFile(buffer.getvalue()),
+    )
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def chunk_rng(kind, start):
+    # Случайность зависит от seed и места порции, а не от процесса,
+    # поэтому число процессов не меняет результат.
+    return random.Random(f'{_context["seed"]}:{kind}:{start}')
+
+
+def make_users(start, stop):
+    first = _context['first_user']
+    password = _context['password']
+
+    return [
+        User(pk=first + number, username=f'user{first + number}',
+             password=password)
+        for number in range(start + 1, stop + 1)
+    ]
+
+
+def make_posts(start, stop):
+    rng = chunk_rng('posts', start)
+    user_ids, group_ids = _context['user_ids'], _context['group_ids']
+    images, total = _context['images'], _context['posts']
+    posts = []
+    for number in range(start, stop):
+        group_id = None
+        if group_ids and rng.random() < 0.7:
+            group_id = rng.choices(
+                group_ids,
+                cum_weights=_context['group_weights'],
+            )[0]
+        posts.append(Post(
+            pk=_context['first_post'] + number + 1,
+            author_id=rng.choices(
+                user_ids,
+                cum_weights=_context['author_weights'],
+            )[0],
+            group_id=group_id,
+            text=sentence(rng, rng.randint(5, 40)),
+            image=images[number] if number < len(images) else '',
+            pub_date=_context['now'] - timedelta(minutes=total - number),
+        ))
+
+    return posts
+
+
+def make_follows(start, stop):
+    rng = chunk_rng('follows', start)
+    user_ids = _context['user_ids']
+    follows = []
+    for user_id in user_ids[start:stop]:
+        authors = set(rng.choices(
+            user_ids,
+            cum_weights=_context['author_weights'],
+            k=min(_context['follows'], len(user_ids) - 1),
+        ))
+        authors.discard(user_id)
+        follows.extend(
+            Follow(user_id=user_id, author_id=author_id)
+            for author_id in sorted(authors)
+        )
+
+    return follows
+
+
+def make_comments(start, stop):
+    rng = chunk_rng('comments', start)
+    post_ids, user_ids = _context['post_ids'], _context['user_ids']
+    total = _context['comments']
+
+    return [
+        Comment(
+            post_id=rng.choices(
+                post_ids,
+                cum_weights=_context['post_weights'],
+            )[0],
+            author_id=rng.choice(user_ids),
+            text=sentence(rng, rng.randint(3, 15)),
+            created=_context['now'] - timedelta(seconds=total - number),
+        )
+        for number in range(start, stop)
+    ]
+
+
+FACTORIES = {
+    'users': (User, make_users, ()),
+    'posts': (Post, make_posts, ('pub_date',)),
+    'follows': (Follow, make_follows, ()),
+    'comments': (Comment, make_comments, ('created',)),
+}
+
+
+def init_worker(context):
+    _context.clear()
+    _context.update(context)
+
+
+def build_chunk(kind, start, stop):
+    return FACTORIES[kind][1](start, stop)
+
+
+def write_chunk(kind, objects):
+    model, factory, date_fields = FACTORIES[kind]
+    with explicit_dates(*(model._meta.get_field(f) for f in date_fields)):
+        model.objects.bulk_create(objects)
+
+    return len(objects)
+
+
+def insert_chunk(kind, start, stop):
+    '''Создаёт и вставляет одну порцию строк, возвращает их число'''
+
+    return write_chunk(kind, build_chunk(kind, start, stop))
+
+
+def insert_all(kind, total, pool, batch_size):
+    '''Вставляет total позиций порциями, в пуле процессов если он есть.
+
+    SQLite пускает одного писателя, поэтому с ним процессы только
+    строят объекты, а родитель пишет их одной транзакцией.
+    '''
+
+    chunks = [
+        (kind, start, min(start + batch_size, total))
+        for start in range(0, total, batch_size)
+    ]
+    if pool is None:
+        return sum(insert_chunk(*chunk) for chunk in chunks)
+    if not chunks:
+        return 0
+    if connection.vendor == 'sqlite':
+        with transaction.atomic():
+            return sum(
+                write_chunk(kind, objects)
+                for objects in pool.map(build_chunk, *zip(*chunks))
+            )
+
+    return sum(pool.map(insert_chunk, *zip(*chunks)))
+
+
+def rebuild_derived():
+    '''Пересчитывает то, что при записи ведут сигналы.
+
+    Нужна после bulk_create: счётчики, ленты, тренды, поисковый
+    индекс, граф подписок и поколения кеша; рекомендации помечаются
+    устаревшими. Возвращает число записей лент.
+    '''
+
+    counters.create_missing_stats()
+    counters.recount()
+    AuthorStats.objects.update(recommendations_stale=True)
+    timeline.rebuild()
+    trending.rebuild()
+    search_backend.rebuild()
+    caching.bump(
+        *caching.index_namespaces(),
+        *caching.fragment_namespaces(),
+        *caching.follow_graph_namespaces(),
+    )
+
+    return TimelineEntry.objects.count()
+
+
+def worker_pool(workers):
+    '''Пул процессов, которым передан текущий контекст генерации'''
+
+    return process_pool(workers, init_worker, (dict(_context),))
+
+
+def seed_dataset(
+    users=100,
+    groups=10,
+    posts=1000,
+    comments=2000,
+    follows=10,
+    images=0,
+    seed=0,
+    batch_size=BATCH_SIZE,
+    workers=1,
+    progress=None,
+):
+    '''Заполняет базу синтетическими данными через bulk_create.
+
+    bulk_create не шлёт сигналы моделей, поэтому после вставки
+    счётчики, ленты и поисковый индекс пересчитываются целиком.
+    Авторы постов, популярность групп, подписки и комментарии
+    распределены по степенному закону. id пользователей, групп и постов
+    задаются явно, поэтому один seed даёт одни и те же данные при любом
+    числе процессов; даты отсчитываются от момента запуска.
+    progress(этап, строк, секунд) вызывается после каждого этапа.
+    '''
+
+    rng = random.Random(seed)
+    created = {}
+
+    def phase(name, run):
+        started = time.perf_counter()
+        created[name] = run()
+        if progress:
+            progress(name, created[name], time.perf_counter() - started)
+
+    first_user = last_id(User)
+    init_worker({
+        'seed': seed,
+        'now': timezone.now(),
+        'first_user': first_user,
+        'password': make_password(PASSWORD),
+        'posts': posts,
+        'comments': comments,
+        'follows': follows,
+    })
+    with worker_pool(workers) as pool:
+        phase('users', lambda: insert_all('users', users, pool, batch_size))
+    _context['user_ids'] = user_ids = list(
+        range(first_user + 1, first_user + users + 1)
+    )
+    _context['author_weights'] = zipf_weights(len(user_ids))
+
+    first_group = last_id(Group)
+    phase('groups', lambda: len(Group.objects.bulk_create(
+        Group(
+            pk=first_group + number,
+            title=f'Группа {first_group + number}',
+            slug=f'group{first_group + number}',
+            description=sentence(rng),
+        )
+        for number in range(1, groups + 1)
+    )))
+    _context['group_ids'] = group_ids = list(
+        range(first_group + 1, first_group + groups + 1)
+    )
+    _context['group_weights'] = zipf_weights(len(group_ids))
+
+    def make_images():
+        _context['images'] = [
+            placeholder_image(rng, number) for number in range(images)
+        ]
+        return images
+
+    phase('images', make_images)
+
+    _context['first_post'] = first_post = last_id(Post)
+    with worker_pool(workers) as pool:
+        phase('posts', lambda: insert_all('posts', posts, pool, batch_size))
+    _context['post_ids'] = post_ids = list(
+        range(first_post + 1, first_post + posts + 1)
+    )
+    reset_sequences(User, Group, Post)
+    _context['post_weights'] = zipf_weights(len(post_ids))
+
+    with worker_pool(workers) as pool:
+        phase('follows', lambda: insert_all(
+            'follows',
+            len(user_ids),
+            pool,
+            batch_size,
+        ))
+        phase('comments', lambda: insert_all(
+            'comments',
+            comments if post_ids else 0,
+            pool,
+            batch_size,
+        ))
+
+    phase('timeline', rebuild_derived)
+
+    return created
@@ -0,0 +1,236 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    caching,
+    follow_graph,
+    recommendations,
+    thumbnails,
+    timeline,
+    trending,
+)
+from .counters import change
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .search import backend as search_backend
+
+User = get_user_model()
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def invalidate_pages(post, *group_ids):
+    '''Сдвигает поколения страниц, на которых виден пост'''
+
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None],
+    ).values_list('slug', flat=True)
+    namespaces = [
+        *caching.index_namespaces(),
+        *caching.profile_namespaces(post.author_id),
+    ]
+    for slug in slugs:
+        namespaces.extend(caching.group_namespaces(slug))
+    caching.bump(*namespaces)
+
+
+def invalidate_profiles(*user_ids):
+    '''Сдвигает поколения страниц профилей'''
+
+    caching.bump(*(
+        namespace
+        for user_id in user_ids
+        for namespace in caching.profile_namespaces(user_id)
+    ))
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    '''Новому пользователю заводятся счётчики'''
+
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_previous_state(sender, instance, **kwargs):
+    '''Запоминает прежнюю группу поста, сбрасывает варианты новой картинки'''
+
+    instance._old_group_id = None
+    if not instance.pk:
+        return
+    old_group_id, old_image = Post.objects.filter(
+        pk=instance.pk,
+    ).values_list('group_id', 'image').first() or (None, None)
+    instance._old_group_id = old_group_id
+    if old_image != instance.image.name:
+        instance.image_variants = False
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    '''Новый пост попадает в ленты подписчиков и в счётчики'''
+
+    search_backend.index_posts([instance.pk])
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: thumbnails.enqueue(name))
+        if not instance.image_variants:
+            transaction.on_commit(lambda: thumbnails.enqueue_variants(name))
+    if not created:
+        old_group_id = getattr(instance, '_old_group_id', None)
+        if old_group_id != instance.group_id:
+            change_group(old_group_id, -1)
+            change_group(instance.group_id, 1)
+            trending.post_moved(instance)
+        invalidate_pages(instance, old_group_id, instance.group_id)
+        return
+    invalidate_pages(instance, instance.group_id)
+    change(
+        AuthorStats.objects.filter(user_id=instance.author_id),
+        'posts_count',
+        1,
+    )
+    change_group(instance.group_id, 1)
+    timeline.fan_out(instance)
+    trending.post_created(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    '''Удалённый пост вычитается из счётчиков и поискового индекса'''
+
+    search_backend.remove_posts([instance.pk])
+    change(
+        AuthorStats.objects.filter(user_id=instance.author_id),
+        'posts_count',
+        -1,
+    )
+    change_group(instance.group_id, -1)
+    invalidate_pages(instance, instance.group_id)
+
+
+@receiver(pre_save, sender=Group)
+def group_previous_state(sender, instance, **kwargs):
+    '''Запоминает прежние slug и название группы'''
+
+    instance._old_slug = instance._old_title = None
+    if instance.pk:
+        instance._old_slug, instance._old_title = Group.objects.filter(
+            pk=instance.pk,
+        ).values_list('slug', 'title').first() or (None, None)
+
+
+@receiver(pre_delete, sender=Group)
+def group_posts_loaded(sender, instance, **kwargs):
+    '''Запоминает посты удаляемой группы для переиндексации'''
+
+    instance._post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    '''Изменение группы сбрасывает ленты, страницы группы и карточки постов'''
+
+    namespaces = [
+        *caching.index_namespaces(),
+        *caching.fragment_namespaces(),
+    ]
+    for slug in {instance.slug, getattr(instance, '_old_slug', None)}:
+        if slug:
+            namespaces.extend(caching.group_namespaces(slug))
+    caching.bump(*namespaces)
+    if hasattr(instance, '_post_ids'):
+        search_backend.index_posts(instance._post_ids)
+    elif getattr(instance, '_old_title', None) not in (None, instance.title):
+        search_backend.index_group(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    '''Новый комментарий увеличивает счётчик и вес поста в трендах'''
+
+    if created:
+        change(
+            Post.objects.filter(pk=instance.post_id),
+            'comments_count',
+            1,
+        )
+        trending.commented(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    '''Удалённый комментарий уменьшает счётчик поста'''
+
+    change(Post.objects.filter(pk=instance.post_id), 'comments_count', -1)
+
+
+def followed(user_id, author_ids):
+    '''Подписки появились: счётчики, лента, граф, кеш и рекомендации'''
+
+    if not author_ids:
+        return
+    change(
+        AuthorStats.objects.filter(user_id__in=author_ids),
+        'followers_count',
+        1,
+    )
+    change(
+        AuthorStats.objects.filter(user_id=user_id),
+        'following_count',
+        len(author_ids),
+    )
+    timeline.backfill(user_id, *author_ids)
+    # Поколения сдвигаются после коммита: иначе страницу успели бы
+    # пересобрать без подписки и сохранить под новым поколением.
+    transaction.on_commit(lambda: invalidate_profiles(user_id, *author_ids))
+    recommendations.mark_stale(user_id)
+    follow_graph.changed(user_id, *author_ids)
+
+
+def unfollowed(user_id, author_ids):
+    '''Подписки удалены: счётчики, лента, граф, кеш и рекомендации'''
+
+    if not author_ids:
+        return
+    change(
+        AuthorStats.objects.filter(user_id__in=author_ids),
+        'followers_count',
+        -1,
+    )
+    change(
+        AuthorStats.objects.filter(user_id=user_id),
+        'following_count',
+        -len(author_ids),
+    )
+    for author_id in author_ids:
+        timeline.prune(user_id, author_id)
+    follow_graph.changed(user_id, *author_ids)
+    transaction.on_commit(lambda: invalidate_profiles(user_id, *author_ids))
+    recommendations.mark_stale(user_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    '''Новая подписка меняет счётчики и дополняет ленту постами автора'''
+
+    if created:
+        followed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    '''Отписка меняет счётчики и убирает посты автора из ленты'''
+
+    unfollowed(instance.user_id, [instance.author_id])
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.caching import render_post_fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_fragments(posts, hide_group=False):
+    '''Карточки постов страницы из кеша фрагментов'''
+
+    return [
+        mark_safe(fragment)
+        for fragment in render_post_fragments(posts, hide_group)
+    ]
@@ -0,0 +1,12 @@
+from django import template
+
+from posts.thumbnails import variant_srcsets
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_srcsets(image):
+    '''srcset нарезанных размеров картинки поста'''
+
+    return variant_srcsets(image.name)
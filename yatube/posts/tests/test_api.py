@@ -0,0 +1,282 @@
+from io import StringIO
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+
+from api.constants import API_PAGE_SIZE
+from api.models import Token
+from core.testing import QueryBudgetMixin
+from posts.constants import FOLLOW_BULK_LIMIT
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        for number in range(API_PAGE_SIZE + 2):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.reader,
+            text='Комментарий',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_posts_cursor_pagination(self):
+        """Лента листается курсором без пропусков и повторов"""
+        response = self.client.get(reverse('api:posts'))
+        self.assertQueryBudget(response, 1)
+        first = response.json()
+        self.assertEqual(len(first['results']), API_PAGE_SIZE)
+        self.assertEqual(first['results'][0]['id'], self.post.pk)
+        self.assertEqual(first['results'][0]['author'], 'author')
+        self.assertEqual(first['results'][0]['group'], 'slug')
+        self.assertIsNone(first['previous'])
+        second = self.client.get(
+            reverse('api:posts'),
+            {'cursor': first['next']},
+        ).json()
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk',
+                flat=True,
+            )),
+        )
+        self.assertIsNone(second['next'])
+
+    def test_field_selection(self):
+        """?fields= оставляет только запрошенные поля"""
+        response = self.client.get(
+            reverse('api:post', args=[self.post.pk]),
+            {'fields': 'id,text'},
+        )
+        self.assertEqual(
+            response.json(),
+            {'id': self.post.pk, 'text': self.post.text},
+        )
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    def test_etag(self):
+        """Повторный GET с If-None-Match получает 304"""
+        url = reverse('api:group_posts', args=['slug'])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        Post.objects.create(author=self.author, text='Новый', group=self.group)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+
+    def test_create_post_validates_with_form(self):
+        """Создание поста проверяется правилами PostForm"""
+        url = reverse('api:posts')
+        self.assertEqual(
+            self.client.post(url, {'text': 'Аноним'}).status_code,
+            401,
+        )
+        response = self.author_client.post(
+            url,
+            {'text': '', 'group': 'slug'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        response = self.author_client.post(
+            url,
+            {'text': 'Из API', 'group': 'slug'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['group'], 'slug')
+        self.assertTrue(Post.objects.filter(
+            text='Из API',
+            author=self.author,
+            group=self.group,
+        ).exists())
+
+    def test_edit_and_delete_post(self):
+        """Пост меняет и удаляет только автор"""
+        url = reverse('api:post', args=[self.post.pk])
+        response = self.reader_client.patch(
+            url,
+            {'text': 'Чужой'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.author_client.patch(
+            url,
+            {'text': 'Исправлен'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['text'], 'Исправлен')
+        self.assertEqual(response.json()['group'], 'slug')
+        self.assertEqual(self.author_client.delete(url).status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_token_auth(self):
+        """Клиент с токеном пишет без CSRF, сессия без CSRF — нет"""
+        url = reverse('api:posts')
+        data = {'text': 'По токену'}
+        out = StringIO()
+        call_command('issue_api_token', 'author', stdout=out)
+        key = out.getvalue().strip()
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(
+            url,
+            data,
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {key}',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'author')
+
+        Token.issue(self.author)
+        response = client.post(
+            url,
+            data,
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {key}',
+        )
+        self.assertEqual(response.status_code, 401)
+
+        client.force_login(self.author)
+        response = client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Post.objects.filter(text='По токену').count(), 1)
+
+    def test_patch_form_bodies(self):
+        """PATCH принимает форму и multipart, другое тело — 415"""
+        url = reverse('api:post', args=[self.post.pk])
+        response = self.author_client.patch(
+            url,
+            urlencode({'text': 'Из формы'}),
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.json()['text'], 'Из формы')
+        response = self.author_client.patch(
+            url,
+            encode_multipart(BOUNDARY, {'text': 'Из multipart'}),
+            content_type=MULTIPART_CONTENT,
+        )
+        self.assertEqual(response.json()['text'], 'Из multipart')
+        response = self.author_client.patch(
+            url,
+            'text=Текст',
+            content_type='text/plain',
+        )
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text,
+            'Из multipart',
+        )
+
+    def test_comments(self):
+        """Комментарии читаются списком и добавляются через CommentForm"""
+        url = reverse('api:comments', args=[self.post.pk])
+        response = self.reader_client.post(
+            url,
+            {'text': 'Ещё'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        texts = [row['text'] for row in self.client.get(url).json()['results']]
+        self.assertEqual(texts, ['Ещё', 'Комментарий'])
+
+    def test_follows(self):
+        """Подписка идемпотентна, на себя подписаться нельзя"""
+        url = reverse('api:follows')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        data = {'author': 'author'}
+        response = self.reader_client.post(
+            url,
+            data,
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.reader_client.post(
+            url,
+            data,
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.reader_client.get(url).json()['results'],
+            [{'id': response.json()['id'], 'author': 'author'}],
+        )
+        response = self.author_client.post(
+            url,
+            data,
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.reader_client.delete(
+            reverse('api:follow', args=['author'])
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+
+    def test_bulk_follows(self):
+        """PATCH подписывает и отписывает списком в одной транзакции"""
+        url = reverse('api:follows')
+        third = User.objects.create_user(username='third')
+        Follow.objects.create(user=self.reader, author=third)
+        response = self.reader_client.patch(
+            url,
+            {'follow': ['author', 'reader', 'missing'], 'unfollow': ['third']},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'followed': 1, 'unfollowed': 1})
+        self.assertEqual(
+            list(Follow.objects.filter(user=self.reader).values_list(
+                'author__username',
+                flat=True,
+            )),
+            ['author'],
+        )
+        response = self.reader_client.patch(
+            url,
+            {'follow': ['author'] * (FOLLOW_BULK_LIMIT + 1)},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.reader_client.patch(
+            url,
+            {'follow': 'author'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
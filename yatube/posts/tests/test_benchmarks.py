@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.benchmarks import percentile, run_benchmarks
+from posts.models import Comment, Follow, Post, TimelineEntry
+from posts.seeding import seed_dataset
+
+DATASET = {
+    'users': 20,
+    'groups': 3,
+    'posts': 60,
+    'comments': 40,
+    'follows': 4,
+}
+
+
+class SeedingTests(TestCase):
+    def test_seed_dataset(self):
+        """Генератор создаёт строки и согласованные производные данные"""
+        created = seed_dataset(**DATASET)
+        self.assertEqual(created['posts'], Post.objects.count())
+        self.assertEqual(created['comments'], Comment.objects.count())
+        self.assertEqual(created['follows'], Follow.objects.count())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertFalse(any(counters.recount(dry_run=True).values()))
+
+    def test_seed_is_deterministic(self):
+        """Один seed даёт те же данные при повторном запуске"""
+        def snapshot():
+            return list(Post.objects.order_by('-pk').values_list(
+                'text',
+                flat=True,
+            )[:DATASET['posts']])
+
+        seed_dataset(**DATASET, seed=7)
+        first = snapshot()
+        seed_dataset(**DATASET, seed=7)
+        self.assertEqual(snapshot(), first)
+
+    def test_seed_command_reports_rate(self):
+        """Команда seed_yatube печатает скорость каждого этапа"""
+        out = StringIO()
+        call_command(
+            'seed_yatube',
+            users=10,
+            groups=2,
+            posts=30,
+            comments=10,
+            follows=2,
+            workers=1,
+            stdout=out,
+        )
+        self.assertEqual(Post.objects.count(), 30)
+        for phase in ('users', 'posts', 'follows', 'comments', 'timeline'):
+            self.assertIn(phase, out.getvalue())
+        self.assertIn('строк/с', out.getvalue())
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+
+    def test_run_benchmarks(self):
+        """Сводка содержит перцентили, запросы и память по сценариям"""
+        seed_dataset(**DATASET)
+        results = run_benchmarks(
+            iterations=3,
+            names=['index', 'post_detail', 'add_comment'],
+        )
+        self.assertEqual(
+            set(results),
+            {'index', 'post_detail', 'add_comment'},
+        )
+        for result in results.values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries'], 0)
+            self.assertGreater(result['peak_memory_kb'], 0)
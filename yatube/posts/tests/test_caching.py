@@ -0,0 +1,150 @@
+from io import StringIO
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Post, User
+
+
+class FetchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def fetch(self, version=1, **kwargs):
+        return caching.fetch(
+            'key',
+            self.compute,
+            60,
+            version,
+            'test',
+            **kwargs,
+        )
+
+    def test_hit_and_version_refresh(self):
+        """Запись читается до смены версии, затем пересобирается"""
+        self.assertEqual(self.fetch(), 1)
+        self.assertEqual(self.fetch(), 1)
+        self.assertEqual(self.fetch(version=2), 2)
+        report = caching.metrics('test')['test']
+        self.assertEqual(
+            (report['miss'], report['hit'], report['refresh']),
+            (1, 1, 1),
+        )
+        self.assertEqual(report['hit_rate'], 1 / 3)
+
+    def test_single_flight_serves_stale(self):
+        """Пока один запрос пересобирает, остальные получают старое"""
+        self.fetch()
+        cache.add(caching.LOCK_KEY.format('key'), 1)
+        self.assertEqual(self.fetch(version=2), 1)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(caching.metrics('test')['test']['stale'], 1)
+
+    def test_metrics_need_shared_cache(self):
+        """cache_metrics отказывается читать кеш одного процесса"""
+        with self.assertRaises(CommandError):
+            call_command('cache_metrics', 'test')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory.name,
+        }}):
+            caching.record('test', 'hit')
+            out = StringIO()
+            call_command('cache_metrics', 'test', stdout=out)
+        self.assertIn('hit 100.0%', out.getvalue())
+
+    def test_miss_waits_for_other_build(self):
+        """Без записи запрос ждёт чужую сборку, а не собирает сам"""
+        cache.add(caching.LOCK_KEY.format('key'), 1)
+
+        def other_build(seconds):
+            cache.set('key', ('готово', 1, float('inf'), 0.0))
+
+        with mock.patch('posts.caching.time.sleep', other_build):
+            self.assertEqual(self.fetch(), 'готово')
+        self.assertEqual(self.calls, 0)
+
+    def test_early_refresh(self):
+        """Досрочное обновление до мягкого срока"""
+        self.fetch()
+        key_entry = cache.get('key')
+        cache.set('key', (key_entry[0], 1, key_entry[2], 1000.0))
+        with mock.patch('posts.caching.random.random', return_value=0.99):
+            self.assertEqual(self.fetch(), 2)
+        self.assertEqual(caching.metrics('test')['test']['early'], 1)
+
+    def test_uncacheable_not_stored(self):
+        """Значение, которое нельзя кешировать, не сохраняется"""
+        self.fetch(cacheable=lambda value: False)
+        self.assertIsNone(cache.get('key'))
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Пост')
+
+    def test_concurrent_rebuild_served_stale(self):
+        """После записи страницу пересобирает один запрос"""
+        client = Client()
+        index = reverse('posts:index')
+        content = client.get(index).content
+        Post.objects.create(author=self.author, text='Новый пост')
+        add = cache.add
+
+        def locked(key, *args, **kwargs):
+            # Блокировку пересборки держит другой запрос.
+            if key.startswith('lock:'):
+                return False
+            return add(key, *args, **kwargs)
+
+        with mock.patch.object(cache, 'add', locked):
+            self.assertEqual(client.get(index).content, content)
+        self.assertIn('Новый пост'.encode(), client.get(index).content)
+
+    def test_profile_keyed_by_id(self):
+        """Поколение профиля не содержит имени: оно бывает не ASCII"""
+        author = User.objects.create_user(username='автор_' + 'я' * 140)
+        client = Client()
+        url = reverse('posts:profile', args=[author.username])
+        self.assertNotIn('Свежий'.encode(), client.get(url).content)
+        with mock.patch.object(
+            caching,
+            'bump',
+            wraps=caching.bump,
+        ) as bump:
+            Post.objects.create(author=author, text='Свежий')
+        namespaces = [name for call in bump.call_args_list for name in call[0]]
+        self.assertIn(f'profile:{author.pk}', namespaces)
+        self.assertFalse(any(author.username in name for name in namespaces))
+        self.assertIn('Свежий'.encode(), client.get(url).content)
+
+    def test_browser_revalidates(self):
+        """Срок записи в кеше не уходит браузеру: private, max-age=0"""
+        client = Client()
+        client.force_login(self.author)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        for url in urls:
+            for _ in range(2):
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    cache_control = response['Cache-Control']
+                    self.assertIn('private', cache_control)
+                    self.assertIn('max-age=0', cache_control)
+                    self.assertFalse(response.has_header('Expires'))
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.author,
+                text=f'Комментарий {number}',
+            )
+            for number in range(5)
+        ]
+        cls.comments.reverse()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_detail_renders_first_page(self):
+        """Страница поста показывает только первую порцию, новые сверху"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:2])
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', args=[self.post.pk]),
+        )
+
+    def test_fragment_chunks_cover_all_comments(self):
+        """Фрагменты по курсору отдают все комментарии без повторов"""
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(url, {'cursor': cursor or ''})
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            self.assertFalse(hasattr(page, 'number'))
+            self.assertEqual(page.has_next(), page.next_cursor is not None)
+            seen.extend(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.comments)
+
+    def test_json_chunk(self):
+        """format=json отдаёт порцию данными и курсор следующей"""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'format': 'json'},
+        )
+        data = response.json()
+        self.assertEqual(
+            [row['text'] for row in data['results']],
+            [comment.text for comment in self.comments[:2]],
+        )
+        self.assertEqual(data['results'][0]['author'], 'author')
+        self.assertIsNotNone(data['next'])
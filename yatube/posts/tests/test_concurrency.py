@@ -0,0 +1,185 @@
+import asyncio
+import json
+import threading
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from core.concurrent import gather
+from core.querycount import count_queries
+from posts.benchmarks import request_scope, server_throughput
+from posts.models import Post, User
+
+
+def call(application, scope, body=b''):
+    '''Ответ ASGI-приложения: (статус, заголовки, тело)'''
+
+    messages = []
+    requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # Клиент на связи, пока не получит ответ.
+        return await asyncio.Future()
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = messages[0]
+
+    return (
+        start['status'],
+        dict(start['headers']),
+        b''.join(message.get('body', b'') for message in messages[1:]),
+    )
+
+
+class ClosingStream:
+    '''Длинный потоковый ответ, который считает закрытия'''
+
+    closed = 0
+
+    def application(self, environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return self
+
+    def __iter__(self):
+        return (b'x' * 1024 for _ in range(1000))
+
+    def close(self):
+        self.closed += 1
+
+
+@override_settings(QUERY_WORKERS=2)
+class ConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def test_gather_runs_in_threads(self):
+        """Чтения идут в потоках пула и попадают в счётчик запросов"""
+        def read():
+            return threading.current_thread().name, Post.objects.count()
+
+        with count_queries() as recorder:
+            results = gather(read, read)
+        self.assertEqual([count for _, count in results], [1, 1])
+        for name, _ in results:
+            self.assertTrue(name.startswith('query'))
+        self.assertEqual(recorder.count, 2)
+
+    def test_gather_in_transaction_is_sequential(self):
+        """Внутри транзакции чтения видят её данные в текущем потоке"""
+        with transaction.atomic():
+            Post.objects.create(author=self.author, text='Ещё')
+            names = gather(
+                lambda: threading.current_thread().name,
+                lambda: Post.objects.count(),
+            )
+        self.assertEqual(names, [threading.current_thread().name, 2])
+
+    def test_asgi_serves_pages(self):
+        """ASGI-приложение отдаёт страницы и передаёт тело запроса"""
+        application = ASGIHandler(WSGIHandler(), workers=2)
+        self.addCleanup(application.executor.shutdown)
+        status, headers, body = call(
+            application,
+            request_scope(reverse('posts:profile', args=['author'])),
+        )
+        self.assertEqual(status, 200)
+        self.assertIn('Пост'.encode(), body)
+
+        status, _, body = call(
+            application,
+            request_scope(reverse('api:post', args=[self.post.pk])),
+        )
+        self.assertEqual(json.loads(body)['text'], 'Пост')
+
+    def test_asgi_streams_chunks(self):
+        """Потоковый ответ уходит кусками, HEAD — без тела"""
+        def streaming(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return (f'{number}\n'.encode() for number in range(100))
+
+        application = ASGIHandler(streaming, workers=1)
+        self.addCleanup(application.executor.shutdown)
+        status, _, body = call(application, request_scope('/'))
+        self.assertEqual(body.count(b'\n'), 100)
+        scope = request_scope('/')
+        scope['method'] = 'HEAD'
+        self.assertEqual(call(application, scope)[2], b'')
+
+    def test_asgi_passes_body_and_headers(self):
+        """Тело и заголовки запроса доходят до WSGI-приложения"""
+        def echo(environ, start_response):
+            method = environ['REQUEST_METHOD']
+            start_response('201 Created', [('X-Method', method)])
+            return [
+                environ['CONTENT_TYPE'].encode(),
+                environ['wsgi.input'].read(),
+            ]
+
+        application = ASGIHandler(echo, workers=1)
+        self.addCleanup(application.executor.shutdown)
+        scope = request_scope('/')
+        scope['method'] = 'POST'
+        scope['headers'].append((b'content-type', b'text/plain'))
+        status, headers, body = call(application, scope, b'|data')
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'x-method'], b'POST')
+        self.assertEqual(body, b'text/plain|data')
+
+    def test_server_throughput(self):
+        """Замер WSGI и ASGI проходит без ошибок сервера"""
+        urls = [reverse('posts:post_detail', args=[self.post.pk])]
+        for mode in ('wsgi', 'asgi'):
+            result = server_throughput(mode, urls, concurrency=2, requests=4)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['requests_per_second'], 0)
+
+    def test_asgi_client_disconnects_mid_stream(self):
+        """Уход клиента освобождает поток пула и закрывает ответ"""
+        stream = ClosingStream()
+        application = ASGIHandler(stream.application, workers=1)
+        self.addCleanup(application.executor.shutdown)
+        sent = []
+
+        async def failing_send(message):
+            sent.append(message)
+            if len(sent) > 2:
+                raise OSError('Соединение разорвано')
+
+        async def stuck_send(message):
+            sent.append(message)
+            if len(sent) > 2:
+                await asyncio.Future()
+
+        requests = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.sleep(0.05)
+            return {'type': 'http.disconnect'}
+
+        async def request(send):
+            requests.append({'type': 'http.request', 'body': b''})
+            await asyncio.wait_for(
+                application(request_scope('/'), receive, send),
+                timeout=5,
+            )
+
+        with self.assertRaises(OSError):
+            asyncio.run(request(failing_send))
+        self.assertEqual(stream.closed, 1)
+        sent.clear()
+        # Клиент перестал читать и отключился: send больше не вернётся.
+        asyncio.run(request(stuck_send))
+        self.assertEqual(stream.closed, 2)
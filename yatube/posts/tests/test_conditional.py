@@ -0,0 +1,115 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.conditional import (
+    group_validators,
+    post_validators,
+    profile_validators,
+)
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'post_detail': reverse('posts:post_detail', args=[self.post.pk]),
+            'group_list': reverse('posts:group_list', args=['slug']),
+            'profile': reverse('posts:profile', args=['author']),
+        }
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_skips_rendering(self):
+        """Совпавший ETag даёт 304 без сборки шаблона"""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(
+                        url,
+                        HTTP_IF_NONE_MATCH=response['ETag'],
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+                # Сессия, пользователь и один запрос валидаторов.
+                self.assertEqual(len(context.captured_queries), 3)
+
+    def test_changes_update_etag(self):
+        """Правка поста, комментарий и подписка меняют ETag"""
+        changes = {
+            'post_detail': lambda: Comment.objects.create(
+                post=self.post,
+                author=self.reader,
+                text='Комментарий',
+            ),
+            'group_list': lambda: Post.objects.filter(
+                pk=self.post.pk,
+            ).first().save(),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader,
+                author=self.author,
+            ),
+        }
+        for name, change in changes.items():
+            with self.subTest(name=name):
+                url = self.urls[name]
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_reader(self):
+        """Другой читатель не получает чужой ETag"""
+        url = self.urls['profile']
+        etag = self.client.get(url)['ETag']
+        response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_use_indexes(self):
+        """Валидаторы — один запрос, который читает только индексы"""
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        calls = (
+            (post_validators, {'post_id': self.post.pk}),
+            (group_validators, {'slug': 'slug'}),
+            (profile_validators, {'username': 'author'}),
+        )
+        for validators, kwargs in calls:
+            with CaptureQueriesContext(connection) as context:
+                validators(request, **kwargs)
+            self.assertEqual(len(context.captured_queries), 1)
+            sql = context.captured_queries[0]['sql']
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                steps = [row[-1] for row in cursor.fetchall()]
+            for step in steps:
+                with self.subTest(validators=validators.__name__, step=step):
+                    self.assertFalse(step.startswith('SCAN'))
+                    self.assertNotIn('TEMP B-TREE', step)
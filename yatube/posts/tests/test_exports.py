@@ -0,0 +1,118 @@
+import csv
+from io import StringIO
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}\nсо строками, "кавычками"',
+                group=cls.group,
+                image='posts/picture.png' if number == 0 else '',
+            )
+            for number in range(5)
+        ]
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.posts[0],
+            author=cls.author,
+            text='Свой комментарий',
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def export(self, **params):
+        response = self.client.get(reverse('posts:export'), params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        """NDJSON содержит свои посты и комментарии, по записи в строке"""
+        records = [
+            json.loads(line)
+            for line in self.export().splitlines()
+        ]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['posts'] * 5 + ['comments'],
+        )
+        self.assertEqual(
+            [record['id'] for record in records[:5]],
+            [post.pk for post in self.posts],
+        )
+        self.assertEqual(records[0]['group'], 'slug')
+        self.assertNotIn('image', records[0])
+        self.assertEqual(records[-1]['text'], 'Свой комментарий')
+
+    def test_csv_export_with_images(self):
+        """CSV с картинками отдаёт абсолютные ссылки"""
+        rows = list(csv.DictReader(StringIO(
+            self.export(format='csv', images=1),
+        )))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['text'], self.posts[0].text)
+        self.assertEqual(
+            rows[0]['image'],
+            'http://testserver/media/posts/picture.png',
+        )
+        self.assertEqual(rows[1]['image'], '')
+
+    def test_export_validation(self):
+        """Смешанный CSV и аноним не выгружаются"""
+        url = reverse('posts:export')
+        self.assertEqual(
+            self.client.get(url, {'format': 'csv', 'kind': 'all'}).status_code,
+            400,
+        )
+        self.assertEqual(Client().get(url).status_code, 302)
+
+    def test_sharded_command(self):
+        """Отрезки команды вместе дают каждый пост ровно один раз"""
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                'export_posts',
+                'posts',
+                output=directory,
+                shards=3,
+                workers=1,
+                stdout=StringIO(),
+            )
+            ids = []
+            for name in sorted(os.listdir(directory)):
+                with open(os.path.join(directory, name)) as file:
+                    ids.extend(json.loads(line)['id'] for line in file)
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+        )
+
+    def test_command_author_to_stdout(self):
+        """--author пишет записи пользователя в stdout"""
+        out = StringIO()
+        call_command('export_posts', 'comments', author='author', stdout=out)
+        self.assertEqual(
+            [json.loads(line)['text'] for line in out.getvalue().splitlines()],
+            ['Свой комментарий'],
+        )
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from posts import follow_graph
+from posts.models import Follow, User
+from posts.seeding import rebuild_derived
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_loads_sorted_ids(self):
+        """Промах кеша читает отсортированный список одним запросом"""
+        for author in reversed(self.authors):
+            Follow.objects.create(user=self.reader, author=author)
+        cache.clear()
+        with self.assertNumQueries(1):
+            ids = list(follow_graph.following(self.reader.pk))
+        self.assertEqual(ids, sorted(author.pk for author in self.authors))
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(
+                self.reader.pk,
+                self.authors[1].pk,
+            ))
+            self.assertEqual(follow_graph.following_count(self.reader.pk), 3)
+
+    def test_rebuild_resets_graph(self):
+        """rebuild_derived сбрасывает граф после bulk_create"""
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, self.authors[0].pk)
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.authors[0])]
+        )
+        rebuild_derived()
+        self.assertTrue(
+            follow_graph.is_following(self.reader.pk, self.authors[0].pk)
+        )
+
+
+class FollowGraphCommitTests(TransactionTestCase):
+    # TestCase не выполняет on_commit, а списки сбрасываются после коммита.
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.first, self.second = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(2)
+        ]
+
+    def test_reload_after_commit(self):
+        """После коммита подписки списки перечитываются из базы"""
+        self.assertEqual(follow_graph.following_count(self.reader.pk), 0)
+        self.assertEqual(follow_graph.followers_count(self.first.pk), 0)
+        with transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.first)
+            Follow.objects.create(user=self.reader, author=self.second)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                follow_graph.following_among(
+                    self.reader.pk,
+                    [self.first.pk, self.second.pk],
+                ),
+                {self.first.pk, self.second.pk},
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(follow_graph.followers(self.first.pk)),
+                [self.reader.pk],
+            )
+
+        Follow.objects.filter(user=self.reader, author=self.first).delete()
+        self.assertFalse(
+            follow_graph.is_following(self.reader.pk, self.first.pk)
+        )
+        self.assertEqual(follow_graph.followers_count(self.first.pk), 0)
+
+    def test_rollback_keeps_cached_lists(self):
+        """Откатившаяся подписка не попадает в кеш"""
+        self.assertEqual(follow_graph.following_count(self.reader.pk), 0)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.reader, author=self.first)
+                raise RuntimeError
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                follow_graph.following_count(self.reader.pk),
+                0,
+            )
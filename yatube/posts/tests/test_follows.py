@@ -0,0 +1,81 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from posts import caching, follows
+from posts.models import AuthorStats, Follow, User
+
+
+class FollowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        cls.usernames = [author.username for author in cls.authors]
+
+    def setUp(self):
+        cache.clear()
+
+    def following_count(self):
+        return AuthorStats.objects.get(user=self.reader).following_count
+
+    def test_follow_is_idempotent(self):
+        """Подписка пишется одним INSERT, повтор ничего не меняет"""
+        # SAVEPOINT, блокировка подписчика, выбор авторов и RELEASE:
+        # без новых подписок INSERT не нужен.
+        with self.assertNumQueries(4):
+            self.assertEqual(follows.follow(self.reader.pk, ['missing']), [])
+        created = follows.follow(
+            self.reader.pk,
+            [*self.usernames, 'reader'],
+        )
+        self.assertCountEqual(created, [user.pk for user in self.authors])
+        self.assertEqual(follows.follow(self.reader.pk, self.usernames), [])
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(self.following_count(), 3)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.authors[0]).followers_count,
+            1,
+        )
+
+    def test_unfollow_is_idempotent(self):
+        """Отписка удаляет только существующие подписки"""
+        follows.follow(self.reader.pk, self.usernames[:2])
+        removed = follows.unfollow(self.reader.pk, self.usernames)
+        self.assertCountEqual(removed, [user.pk for user in self.authors[:2]])
+        self.assertEqual(follows.unfollow(self.reader.pk, self.usernames), [])
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.following_count(), 0)
+
+    def test_profiles_bumped_after_commit(self):
+        """Поколения профилей сдвигаются только после коммита"""
+        namespaces = caching.profile_namespaces(self.authors[0].pk)
+        before = caching.generations(namespaces)
+        with mock.patch.object(transaction, 'on_commit') as on_commit:
+            follows.follow(self.reader.pk, self.usernames[:1])
+        self.assertEqual(caching.generations(namespaces), before)
+        for call in on_commit.call_args_list:
+            call[0][0]()
+        self.assertNotEqual(caching.generations(namespaces), before)
+
+    def test_command(self):
+        """Команда подписывает и отписывает списком"""
+        out = StringIO()
+        call_command('follow_authors', 'reader', *self.usernames, stdout=out)
+        self.assertIn('Создано подписок: 3 из 3', out.getvalue())
+        call_command(
+            'follow_authors',
+            'reader',
+            self.usernames[0],
+            '--unfollow',
+            stdout=out,
+        )
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 2)
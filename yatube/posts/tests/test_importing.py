@@ -0,0 +1,134 @@
+from io import StringIO
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.importing import Importer, import_dump
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
+
+RECORDS = [
+    {'type': 'users', 'username': 'author'},
+    {'type': 'users', 'username': 'reader'},
+    {'type': 'groups', 'slug': 'slug', 'title': 'Группа'},
+    {
+        'type': 'posts',
+        'id': 10,
+        'text': 'Первый',
+        'author': 'author',
+        'group': 'slug',
+        'pub_date': '2020-01-01T10:00:00+00:00',
+    },
+    {'type': 'posts', 'id': 11, 'text': 'Второй', 'author': 'author'},
+    {'type': 'comments', 'id': 5, 'post': 10, 'author': 'reader',
+     'text': 'Комментарий'},
+    {'type': 'follows', 'user': 'reader', 'author': 'author'},
+    # Ошибочные строки отклоняются, загрузка продолжается.
+    {'type': 'posts', 'id': 12, 'text': '', 'author': 'author'},
+    {'type': 'posts', 'id': 13, 'text': 'Пост', 'author': 'nobody'},
+    {'type': 'comments', 'id': 6, 'post': 99, 'author': 'reader',
+     'text': 'К несуществующему'},
+    {'type': 'follows', 'user': 'author', 'author': 'author'},
+]
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'dump.ndjson')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for record in RECORDS:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.write('{не json\n')
+        self.checkpoint = f'{self.path}.checkpoint'
+
+    def assertImported(self):
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('pk', 'text')),
+            [(10, 'Первый'), (11, 'Второй')],
+        )
+        post = Post.objects.get(pk=10)
+        self.assertEqual(post.group, Group.objects.get(slug='slug'))
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().pk, 5)
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader',
+            author__username='author',
+        ).exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user__username='author').posts_count,
+            2,
+        )
+
+    def test_import(self):
+        """Дамп загружается, ошибочные строки отклоняются с номерами"""
+        report = import_dump(self.path, batch_size=3)
+        self.assertImported()
+        self.assertEqual(report['rejected'], 5)
+        self.assertEqual(
+            [line for line, _ in report['errors']],
+            [8, 9, 11, 12, 10],
+        )
+        author = User.objects.get(username='author')
+        self.assertFalse(author.has_usable_password())
+
+    def test_id_collisions(self):
+        """Чужой пост с тем же id не теряется, повтор дампа не вставляет
+        ничего"""
+        stranger = User.objects.create_user(username='stranger')
+        Post.objects.create(pk=10, author=stranger, text='Чужой')
+        report = import_dump(self.path, batch_size=3)
+        self.assertEqual(
+            report['counts'],
+            {'users': 2, 'groups': 1, 'posts': 1, 'comments': 0,
+             'follows': 1},
+        )
+        self.assertEqual(Post.objects.get(pk=10).text, 'Чужой')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            dict(report['errors'])[4],
+            'id 10 занят другой записью',
+        )
+        self.assertEqual(dict(report['errors'])[6], 'Пост 10 отклонён')
+
+        report = import_dump(self.path, batch_size=3)
+        self.assertEqual(sum(report['counts'].values()), 0)
+        self.assertEqual(report['rejected'], 7)
+
+    def test_resume_after_failure(self):
+        """После сбоя загрузка продолжается с отметки без повторов"""
+        flush = Importer.flush
+        calls = []
+
+        def failing_flush(importer):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            flush(importer)
+
+        with mock.patch.object(Importer, 'flush', failing_flush):
+            with self.assertRaises(RuntimeError):
+                import_dump(
+                    self.path,
+                    batch_size=3,
+                    checkpoint=self.checkpoint,
+                )
+        with open(self.checkpoint) as file:
+            self.assertEqual(json.load(file)['line'], 3)
+
+        import_dump(self.path, batch_size=3, checkpoint=self.checkpoint)
+        self.assertImported()
+        self.assertEqual(User.objects.count(), 2)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_command_reports_throughput(self):
+        """Команда печатает число записей и скорость"""
+        out = StringIO()
+        call_command('import_posts', self.path, stdout=out, stderr=StringIO())
+        self.assertImported()
+        self.assertIn('записей/с', out.getvalue())
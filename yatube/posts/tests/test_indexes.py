@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.constants import NUMBER_OF_POSTS
+from posts.models import Comment, Follow, Group, Post, User
+
+FEED_TABLES = ('posts_post', 'posts_comment', 'posts_timelineentry')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+            for number in range(NUMBER_OF_POSTS + 2)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0],
+            author=cls.reader,
+            text='Комментарий',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, url):
+        '''Выборки лент на странице идут по индексу и без сортировки'''
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        page = response.context.get('page_obj')
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(
+                f'FROM "{table}"' in sql for table in FEED_TABLES
+            ):
+                continue
+            for step in self.plan(sql):
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith('SCAN'):
+                        self.assertIn('INDEX', step)
+
+        return getattr(page, 'next_cursor', None)
+
+    def test_feed_queries_use_indexes(self):
+        """Основные запросы страниц читают индекс, а не сортируют таблицу"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            cursor = self.assertIndexedQueries(url)
+            self.assertIsNotNone(cursor)
+            self.assertIndexedQueries(f'{url}?cursor={cursor}')
+        # Старые ссылки ?page=N на ленту подписок сортируют соединение
+        # с Follow по всем авторам, индекс их не покрывает.
+        for url in urls[:-1]:
+            self.assertIndexedQueries(f'{url}?page=2')
+
+    def test_comments_query_uses_index(self):
+        """Комментарии поста читаются по индексу (post, -created, -id)"""
+        self.assertIndexedQueries(
+            reverse('posts:post_detail', args=[self.posts[0].pk])
+        )
@@ -0,0 +1,213 @@
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import Client, TestCase, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from core.querycount import count_queries
+from core.testing import QueryBudgetMixin
+from posts import views
+from posts.constants import CURSOR_PARAM, NUMBER_OF_POSTS
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    Recommendation,
+    User,
+)
+
+
+def budgeted_views(resolver=None, namespace=''):
+    """Имена всех view проекта, объявивших бюджет запросов"""
+    names = set()
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = namespace
+            if pattern.namespace:
+                prefix = f'{namespace}{pattern.namespace}:'
+            names |= budgeted_views(pattern, prefix)
+        elif getattr(pattern.callback, 'query_budget', None) is not None:
+            names.add(f'{namespace}{pattern.name}')
+    return names
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(NUMBER_OF_POSTS + 2):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+        for author in (cls.author, cls.reader, cls.author):
+            Comment.objects.create(
+                post=cls.post,
+                author=author,
+                text='Комментарий',
+            )
+        cls.other = User.objects.create_user(username='other')
+        for user in (cls.author, cls.reader):
+            Recommendation.objects.create(
+                user=user,
+                author=cls.other,
+                rank=0,
+                score=1.0,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assertPagesWithinBudget(self, requests):
+        """Каждый запрос с холодным кешем укладывается в бюджет view"""
+        seen = set()
+        for client, url in requests:
+            with self.subTest(url=url):
+                cache.clear()
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNotNone(response.query_report['budget'])
+                self.assertQueryBudget(response)
+                seen.add(response.query_report['view'])
+        return seen
+
+    def second_page(self, client, url, context='page_obj'):
+        """Адрес следующей страницы по курсору из первой"""
+        cache.clear()
+        cursor = client.get(url).context[context].next_cursor
+        self.assertIsNotNone(cursor)
+        separator = '&' if '?' in url else '?'
+        return f'{url}{separator}{urlencode({CURSOR_PARAM: cursor})}'
+
+    def api_second_page(self, client, url):
+        """Адрес следующей страницы API по курсору из первой"""
+        cache.clear()
+        cursor = client.get(url).json()['next']
+        self.assertIsNotNone(cursor)
+        return f'{url}?{urlencode({CURSOR_PARAM: cursor})}'
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_views_within_budget(self):
+        """Все view с бюджетом укладываются в него во всех вариантах:
+        гость, читатель и автор, ?page=, ?cursor=, популярные авторы"""
+        anonymous = Client()
+        owner = Client()
+        owner.force_login(self.author)
+        index = reverse('posts:index')
+        group = reverse('posts:group_list', args=[self.group.slug])
+        profile = reverse('posts:profile', args=[self.author.username])
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        comments = reverse('posts:post_comments', args=[self.post.pk])
+        follow = reverse('posts:follow_index')
+        search = f'{reverse("posts:search")}?q=Пост'
+        api_posts = reverse('api:posts')
+        requests = []
+        for client in (anonymous, self.client, owner):
+            next_comments = self.second_page(client, detail, 'comments')
+            requests += [
+                (client, index),
+                (client, f'{index}?page=2'),
+                (client, self.second_page(client, index)),
+                (client, group),
+                (client, f'{group}?page=2'),
+                (client, self.second_page(client, group)),
+                (client, profile),
+                (client, f'{profile}?page=2'),
+                (client, self.second_page(client, profile)),
+                (client, detail),
+                (client, next_comments),
+                (client, next_comments.replace(detail, comments, 1)),
+                (client, f'{comments}?format=json'),
+                (client, reverse('posts:trending')),
+                (
+                    client,
+                    reverse('posts:group_trending', args=[self.group.slug]),
+                ),
+                (client, search),
+                (client, self.second_page(client, search)),
+                (client, api_posts),
+                (client, self.api_second_page(client, api_posts)),
+                (client, reverse('api:post', args=[self.post.pk])),
+                (client, reverse('api:comments', args=[self.post.pk])),
+                (client, reverse('api:groups')),
+                (client, reverse('api:group', args=[self.group.slug])),
+                (
+                    client,
+                    reverse('api:group_posts', args=[self.group.slug]),
+                ),
+                (
+                    client,
+                    reverse('api:user_posts', args=[self.author.username]),
+                ),
+            ]
+        for client in (self.client, owner):
+            requests += [
+                (client, follow),
+                (client, f'{follow}?page=2'),
+                (client, reverse('api:follows')),
+            ]
+        requests.append((self.client, self.second_page(self.client, follow)))
+        seen = self.assertPagesWithinBudget(requests)
+        # Все подписки читателя — на популярного автора.
+        with mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 0):
+            seen |= self.assertPagesWithinBudget([
+                (self.client, follow),
+                (self.client, self.second_page(self.client, follow)),
+            ])
+        self.assertEqual(budgeted_views(), seen)
+
+    def test_recommendations_within_budget(self):
+        """Рекомендации на своём профиле и в ленте подписок в бюджете"""
+        owner = Client()
+        owner.force_login(self.author)
+        profile = reverse('posts:profile', args=[self.author.username])
+        follow = reverse('posts:follow_index')
+        requests = (
+            (owner, profile),
+            (owner, f'{profile}?page=2'),
+            (self.client, follow),
+            (self.client, f'{follow}?page=2'),
+        )
+        for client, url in requests:
+            with self.subTest(url=url):
+                cache.clear()
+                response = client.get(url)
+                self.assertTrue(response.context['recommendations'])
+                self.assertQueryBudget(response)
+
+    def test_repeated_queries_detected(self):
+        """Повтор одной формы запроса находится вместе с шаблоном"""
+        with count_queries() as recorder:
+            for post in Post.objects.all()[:3]:
+                render_to_string(
+                    'posts/includes/post_template.html',
+                    {'post': post},
+                )
+        repeated = recorder.repeated()
+        self.assertTrue(any('"auth_user"' in shape for shape in repeated))
+        for count, template in repeated.values():
+            self.assertEqual(count, 3)
+            self.assertEqual(template, 'posts/includes/post_template.html')
+
+    def test_budget_overrun_logged(self):
+        """Превышение бюджета пишется в лог и валит проверку"""
+        with mock.patch.object(views.index, 'query_budget', 1):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                response = self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        with self.assertRaises(AssertionError):
+            self.assertQueryBudget(response)
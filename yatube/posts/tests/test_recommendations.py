@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import AuthorStats, Follow, User
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.friend_of_friend, cls.neighbour, \
+            cls.cofollowed = [
+                User.objects.create_user(username=name)
+                for name in (
+                    'reader', 'friend', 'friend_of_friend', 'neighbour',
+                    'cofollowed',
+                )
+            ]
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.friend_of_friend)
+        Follow.objects.create(user=cls.neighbour, author=cls.friend)
+        Follow.objects.create(user=cls.neighbour, author=cls.cofollowed)
+
+    def setUp(self):
+        cache.clear()
+
+    def suggested(self, user):
+        return [
+            recommendation.author
+            for recommendation in recommendations.for_user(user.pk)
+        ]
+
+    def test_refresh_ranks_graph_neighbours(self):
+        """Друзья друзей и совместные подписки, без своих подписок"""
+        self.assertEqual(recommendations.refresh(), 5)
+        with self.assertNumQueries(1):
+            suggested = self.suggested(self.reader)
+        self.assertEqual(suggested[0], self.friend_of_friend)
+        self.assertIn(self.cofollowed, suggested)
+        self.assertNotIn(self.friend, suggested)
+        self.assertNotIn(self.reader, suggested)
+        self.assertFalse(AuthorStats.objects.filter(
+            recommendations_stale=True,
+        ).exists())
+
+    def test_incremental_refresh(self):
+        """Подписка помечает пользователя и его подписчиков"""
+        recommendations.refresh()
+        Follow.objects.create(user=self.friend, author=self.cofollowed)
+        self.assertCountEqual(
+            AuthorStats.objects.filter(
+                recommendations_stale=True,
+            ).values_list('user__username', flat=True),
+            ['friend', 'reader', 'neighbour'],
+        )
+        self.assertEqual(recommendations.refresh(), 3)
+        self.assertEqual(recommendations.refresh(), 0)
+
+    def test_follow_during_refresh(self):
+        """Подписка после чтения графа оставляет пользователя устаревшим"""
+        load = recommendations.FollowMatrix.load
+
+        def load_then_follow():
+            matrix = load()
+            Follow.objects.create(user=self.reader, author=self.cofollowed)
+            return matrix
+
+        with mock.patch.object(
+            recommendations.FollowMatrix,
+            'load',
+            load_then_follow,
+        ):
+            recommendations.refresh()
+        self.assertTrue(AuthorStats.objects.get(
+            user=self.reader,
+        ).recommendations_stale)
+        self.assertIn(self.cofollowed, self.suggested(self.reader))
+        recommendations.refresh()
+        self.assertNotIn(self.cofollowed, self.suggested(self.reader))
+
+    def test_follow_index_shows_recommendations(self):
+        """Лента подписок показывает рекомендации"""
+        recommendations.refresh()
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [item.author for item in response.context['recommendations']],
+            self.suggested(self.reader),
+        )
@@ -0,0 +1,91 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import PIN_COOKIE
+from core.routers import PrimaryReplicaRouter, use_primary
+from core.testing import SimulatedReplicas
+from posts.models import Post, User
+
+
+@override_settings(QUERY_WORKERS=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    # TestCase держит всё в транзакции, а внутри неё роутер
+    # всегда читает с основной базы. Потоки gather держали бы
+    # соединения с репликами прошлых тестов, поэтому без пула.
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.synced = Post.objects.create(author=self.author, text='Старый')
+        self.client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.replicas = SimulatedReplicas()
+        self.replicas.__enter__()
+        self.addCleanup(self.replicas.__exit__, None, None, None)
+        self.fresh = Post.objects.create(author=self.author, text='Новый')
+
+    def index_posts(self, client):
+        response = client.get(reverse('posts:index'))
+        return list(response.context['page_obj'])
+
+    def detail_status(self, client, post):
+        response = client.get(reverse('posts:post_detail', args=[post.pk]))
+        return response.status_code
+
+    def test_no_replicas_reads_primary(self):
+        """Без реплик роутер читает из default"""
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(
+                PrimaryReplicaRouter().db_for_read(Post),
+                DEFAULT_DB_ALIAS,
+            )
+
+    def test_reads_go_to_replica(self):
+        """Чтение идёт с реплики, которая ещё не получила новый пост"""
+        self.assertEqual(self.detail_status(self.client, self.fresh), 404)
+        self.replicas.sync()
+        self.assertEqual(self.detail_status(self.client, self.fresh), 200)
+
+    def test_page_cache_not_filled_from_replica(self):
+        """Промах кеша страниц читает с основной базы: отстающая
+        реплика не попадает в кеш под новым поколением"""
+        self.assertEqual(
+            self.index_posts(self.client),
+            [self.fresh, self.synced],
+        )
+        newest = Post.objects.create(author=self.author, text='Новейший')
+        self.assertEqual(
+            self.index_posts(self.client),
+            [newest, self.fresh, self.synced],
+        )
+
+    def test_read_your_writes(self):
+        """После записи клиент читает с основной базы, пока стоит cookie"""
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Свой пост'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with use_primary():
+            own = Post.objects.get(text='Свой пост')
+        self.assertEqual(self.detail_status(self.author_client, own), 200)
+        self.assertEqual(self.detail_status(self.client, own), 404)
+
+        self.author_client.cookies[PIN_COOKIE] = '0'
+        self.assertEqual(self.detail_status(self.author_client, own), 404)
+
+    def test_write_views_read_primary(self):
+        """Страницы записи читают с основной базы даже на GET"""
+        response = self.author_client.get(
+            reverse('posts:post_edit', args=[self.fresh.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_unhealthy_replica_falls_back(self):
+        """Недоступные реплики пропускаются, чтение идёт с основной"""
+        for alias in self.replicas.aliases:
+            self.replicas.fail(alias)
+        with self.assertLogs('core.routers', 'WARNING'):
+            status = self.detail_status(self.client, self.fresh)
+        self.assertEqual(status, 200)
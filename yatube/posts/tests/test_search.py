@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.constants import NUMBER_OF_POSTS
+from posts.models import Group, Post, User
+from posts.search import (
+    SearchBackend,
+    SimpleSearchBackend,
+    SqliteSearchBackend,
+    backend,
+    get_backend,
+)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Кулинария',
+            slug='cooking',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Рецепт борща со сметаной',
+            group=cls.group,
+        )
+        cls.other = Post.objects.create(
+            author=cls.user,
+            text='Прогулка по набережной',
+        )
+        cls.SEARCH = reverse('posts:search')
+
+    def search(self, query, **params):
+        response = self.client.get(self.SEARCH, {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_search_by_text_and_prefix(self):
+        """Поиск находит пост по слову и по началу слова"""
+        for query in ('борща', 'БОРЩ', 'смет'):
+            with self.subTest(query=query):
+                self.assertEqual(list(self.search(query)), [self.post])
+
+    def test_search_by_group_title(self):
+        """Поиск находит посты по названию группы"""
+        self.assertEqual(list(self.search('кулинария')), [self.post])
+
+    def test_backend_interface(self):
+        """Бэкенд без всех методов не создаётся, поиск читает через
+        роутер"""
+        class SearchOnly(SearchBackend):
+            def search(self, query, position=None, limit=10):
+                return []
+
+        with self.assertRaises(TypeError):
+            SearchOnly()
+        with mock.patch(
+            'posts.search.router.db_for_read',
+            return_value=DEFAULT_DB_ALIAS,
+        ) as db_for_read:
+            backend.search('борщ')
+        db_for_read.assert_called_once_with(Post)
+
+    def test_backend_follows_database(self):
+        """FTS5 только на SQLite, на других базах — поиск через LIKE"""
+        self.assertIsInstance(get_backend(), SqliteSearchBackend)
+        with mock.patch(
+            'django.db.backends.sqlite3.base.DatabaseWrapper.vendor',
+            'postgresql',
+        ):
+            self.assertIsInstance(get_backend(), SimpleSearchBackend)
+
+    def test_search_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают поиск"""
+        for query in ('"борщ', 'борщ OR', 'NEAR(', '***'):
+            with self.subTest(query=query):
+                self.client.get(self.SEARCH, {'q': query})
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        self.other.text = 'Прогулка с борщом'
+        self.other.save()
+        self.assertIn(self.other, self.search('борщ'))
+        self.other.delete()
+        self.assertEqual(list(self.search('прогулка')), [])
+
+    def test_search_cursor_pages(self):
+        """Результаты поиска листаются курсором"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Борщ номер {i}')
+            for i in range(NUMBER_OF_POSTS)
+        )
+        call_command('rebuild_search_index', verbosity=0)
+        first = self.search('борщ')
+        second = self.search('борщ', cursor=first.next_cursor)
+        self.assertEqual(len(first), NUMBER_OF_POSTS)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(
+            list(self.search('борщ', cursor=second.previous_cursor)),
+            list(first),
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке использует тот же индекс"""
+        admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password',
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'),
+            {'q': 'сметаной'},
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [self.post],
+        )
+        self.assertEqual(
+            list(backend.filter(Post.objects.all(), 'набережной')),
+            [self.other],
+        )
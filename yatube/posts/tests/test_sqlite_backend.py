@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import SimpleTestCase
+
+from core.db.backends.sqlite3.base import DEFAULT_PRAGMAS
+from posts.benchmarks import concurrent_throughput
+from posts.management.commands.benchmark_sqlite import Command
+
+ALIAS = 'tuned'
+
+
+class TunedSQLiteTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.databases[ALIAS] = {
+            **connections.databases[DEFAULT_DB_ALIAS],
+            'ENGINE': 'core.db.backends.sqlite3',
+            'NAME': os.path.join(directory.name, 'tuned.sqlite3'),
+            'OPTIONS': {'pragmas': {'cache_size': -1024}},
+            'TEST': {},
+        }
+        connections.ensure_defaults(ALIAS)
+        self.addCleanup(connections.databases.pop, ALIAS)
+        self.addCleanup(self.close)
+
+    def close(self):
+        if hasattr(connections._connections, ALIAS):
+            getattr(connections._connections, ALIAS).close()
+            delattr(connections._connections, ALIAS)
+
+    def pragma(self, name):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает WAL, NORMAL и свои PRAGMA"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # synchronous NORMAL = 1, temp_store MEMORY = 2.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('cache_size'), -1024)
+        self.assertEqual(
+            self.pragma('mmap_size'),
+            DEFAULT_PRAGMAS['mmap_size'],
+        )
+
+    def test_transaction_takes_write_lock(self):
+        """atomic() начинается с BEGIN IMMEDIATE"""
+        connection = connections[ALIAS]
+        connection.force_debug_cursor = True
+        self.addCleanup(setattr, connection, 'force_debug_cursor', False)
+        with transaction.atomic(using=ALIAS):
+            connection.cursor().execute('SELECT 1')
+        self.assertIn(
+            'BEGIN IMMEDIATE',
+            [query['sql'] for query in connection.queries],
+        )
+
+    def test_concurrent_writes_without_errors(self):
+        """Читатели и писатели работают параллельно без ошибок блокировки"""
+        Command().prepare(ALIAS, 10)
+        self.close()
+        result = concurrent_throughput(
+            ALIAS,
+            readers=2,
+            writers=2,
+            seconds=0.5,
+        )
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['reads_per_second'], 0)
+        self.assertGreater(result['writes_per_second'], 0)
+
+    def test_locked_write_retried(self):
+        """Запрос вне транзакции повторяется, пока базу держит другой"""
+        connections.databases[ALIAS]['OPTIONS']['timeout'] = 0
+        Command().prepare(ALIAS, 1)
+        self.close()
+        holder = sqlite3.connect(
+            connections.databases[ALIAS]['NAME'],
+            check_same_thread=False,
+        )
+        self.addCleanup(holder.close)
+        holder.execute('BEGIN IMMEDIATE')
+        release = threading.Timer(0.08, holder.rollback)
+        release.start()
+        self.addCleanup(release.join)
+        with self.assertLogs('core.db.backends.sqlite3.base', 'WARNING'):
+            with connections[ALIAS].cursor() as cursor:
+                cursor.execute('DELETE FROM posts_post')
+        self.assertEqual(self.count_posts(), 0)
+
+    def count_posts(self):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM posts_post')
+            return cursor.fetchone()[0]
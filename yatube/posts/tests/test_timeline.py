@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import AuthorStats, Post, Follow, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+        cls.FOLLOW = reverse('posts:follow_index')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_follow_backfills_timeline(self):
+        """Подписка дописывает в ленту уже вышедшие посты"""
+        self.reader_client.get(reverse(
+            'posts:profile_follow',
+            args=[self.author],
+        ))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader,
+            post=self.old_post,
+        ).exists())
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается подписчикам"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.reader_client.get(self.FOLLOW)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [post, self.old_post],
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка очищает ленту от постов автора"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            args=[self.author],
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    @mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 0)
+    def test_celebrity_posts_read_directly(self):
+        """Посты популярного автора читаются из Post без раскладки"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        response = self.reader_client.get(self.FOLLOW)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [post, self.old_post],
+        )
+
+    @mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_author_below_limit_backfilled_after_commit(self):
+        """Автор, переставший быть популярным, раскладывается после
+        коммита отписки"""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        with mock.patch.object(transaction, 'on_commit') as on_commit:
+            Follow.objects.filter(user=other, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        for call in on_commit.call_args_list:
+            call[0][0]()
+        self.assertCountEqual(
+            TimelineEntry.objects.filter(
+                user=self.reader,
+            ).values_list('post_id', flat=True),
+            [post.pk, self.old_post.pk],
+        )
+
+    def test_rebuild_keeps_authors_without_stats(self):
+        """Пересборка лент не теряет авторов без строки счётчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.filter(user=self.author).delete()
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader,
+            post=self.old_post,
+        ).exists())
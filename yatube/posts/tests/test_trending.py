@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryBudgetMixin
+from posts import trending
+from posts.constants import TRENDING_HALF_LIFE
+from posts.models import Comment, Group, Post, TrendingPost, User
+
+
+class TrendingTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.quiet = Post.objects.create(author=self.author, text='Тихий')
+        self.discussed = Post.objects.create(
+            author=self.author,
+            text='Обсуждаемый',
+            group=self.group,
+        )
+
+    def comment(self, post, count=1):
+        for number in range(count):
+            Comment.objects.create(
+                post=post,
+                author=self.author,
+                text=f'Комментарий {number}',
+            )
+
+    def test_comments_raise_post(self):
+        """Комментарии поднимают пост, группа видит только свои посты"""
+        self.comment(self.discussed, 2)
+        self.assertEqual(
+            trending.top_posts(),
+            [self.discussed, self.quiet],
+        )
+        self.assertEqual(trending.top_posts(self.group), [self.discussed])
+        self.assertEqual(
+            [item['group__slug'] for item in trending.top_groups()],
+            ['slug'],
+        )
+
+    def test_decay_keeps_order_and_drops_cold(self):
+        """decay сохраняет порядок и убирает остывшие посты"""
+        self.comment(self.discussed)
+        before = trending.top_posts()
+        trending.decay(timezone.now() + timedelta(seconds=TRENDING_HALF_LIFE))
+        self.assertEqual(trending.top_posts(), before)
+        trending.decay(
+            timezone.now() + timedelta(seconds=TRENDING_HALF_LIFE * 20)
+        )
+        self.assertFalse(TrendingPost.objects.exists())
+        self.comment(self.quiet)
+        self.assertEqual(trending.top_posts(), [self.quiet])
+
+    def test_reference_moved_by_another_process(self):
+        """Событие берёт момент отсчёта из таблицы, а не из кеша процесса"""
+        trending.reference()
+        moved = timezone.now() + timedelta(seconds=TRENDING_HALF_LIFE)
+        TrendingPost.objects.update(
+            score=F('score') / trending.factor(moved, trending.reference()),
+            decayed_at=moved,
+        )
+        self.comment(self.discussed)
+        scores = dict(TrendingPost.objects.values_list('post_id', 'score'))
+        trending.rebuild()
+        rebuilt = dict(TrendingPost.objects.values_list('post_id', 'score'))
+        self.assertAlmostEqual(
+            scores[self.discussed.pk] / scores[self.quiet.pk],
+            rebuilt[self.discussed.pk] / rebuilt[self.quiet.pk],
+        )
+
+    def test_rebuild_matches_incremental(self):
+        """Пересчёт с нуля даёт тот же порядок, что и сигналы"""
+        self.comment(self.quiet, 3)
+        incremental = trending.top_posts()
+        trending.rebuild()
+        self.assertEqual(trending.top_posts(), incremental)
+
+    def test_pages(self):
+        """Страницы трендов читают готовый топ"""
+        self.comment(self.discussed)
+        client = Client()
+        response = client.get(reverse('posts:trending'))
+        self.assertQueryBudget(response)
+        self.assertEqual(
+            response.context['posts'],
+            [self.discussed, self.quiet],
+        )
+        response = client.get(
+            reverse('posts:group_trending', args=[self.group.slug])
+        )
+        self.assertQueryBudget(response)
+        self.assertEqual(response.context['posts'], [self.discussed])
@@ -4,12 +4,21 @@ import tempfile
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django import forms
+from sorl.thumbnail import default
 
+from posts.caching import render_post_fragments
 from posts.models import Post, Group, Comment, Follow, User
-from posts.constants import NUMBER_OF_POSTS
+from posts.constants import (
+    IMAGE_VARIANT_WIDTHS,
+    NUMBER_OF_POSTS,
+    THUMBNAIL_GEOMETRY,
+    THUMBNAIL_OPTIONS,
+)
+from posts.thumbnails import generate_missing, variant_name, variant_formats
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 SECOND_PAGE_COUNT_POST = 3
@@ -233,10 +242,92 @@ class PostPagesTests(TestCase):
     def test_cache_index(self):
         """Кеширование главной страницы работает"""
         content = self.client.get(self.INDEX).content
-        Post.objects.all().delete()
+        Post.objects.update(text='Изменено в обход сигналов')
         content_after = self.client.get(self.INDEX).content
         self.assertEqual(content, content_after)
 
+    def test_cache_invalidated_by_post_changes(self):
+        """Новый и удалённый пост сразу сбрасывают кеш страниц"""
+        pages = (
+            self.INDEX,
+            self.GROUP_LIST,
+            self.PROFILE,
+        )
+
+        for page in pages:
+            with self.subTest(value=page):
+                content = self.client.get(page).content
+                post = Post.objects.create(
+                    author=self.user_author,
+                    text='Новый пост мимо кеша',
+                    group=self.group,
+                )
+                content_after = self.client.get(page).content
+                self.assertNotEqual(content, content_after)
+                self.assertIn(post.text.encode(), content_after)
+                post.delete()
+                self.assertEqual(self.client.get(page).content, content)
+
+    def test_post_fragments_cached_until_edit(self):
+        """Карточка поста берётся из кеша до правки поста"""
+        post = Post.objects.get(pk=self.post.pk)
+        fragment, = render_post_fragments([post])
+        post = Post.objects.get(pk=self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(render_post_fragments([post]), [fragment])
+
+        self.author_client.post(self.POST_EDIT, {'text': 'Правка поста'})
+        post = Post.objects.get(pk=self.post.pk)
+        edited, = render_post_fragments([post])
+        self.assertIn('Правка поста', edited)
+
+    def test_thumbnail_not_generated_in_request(self):
+        """Шаблон получает оригинал, пока миниатюра не готова"""
+        default.kvstore.clear()
+        name = self.post.image.name
+        thumbnail = default.backend.get_thumbnail(
+            name,
+            THUMBNAIL_GEOMETRY,
+            **THUMBNAIL_OPTIONS,
+        )
+        self.assertEqual(thumbnail.name, name)
+
+        self.assertTrue(generate_missing(name))
+        thumbnail = default.backend.get_thumbnail(
+            name,
+            THUMBNAIL_GEOMETRY,
+            **THUMBNAIL_OPTIONS,
+        )
+        self.assertNotEqual(thumbnail.name, name)
+        self.assertFalse(generate_missing(name))
+
+    def test_image_variants_in_srcset(self):
+        """Нарезанные размеры картинки выводятся через srcset"""
+        generate_missing(self.post.image.name)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.image_variants)
+        for width in IMAGE_VARIANT_WIDTHS:
+            for fmt, extension in variant_formats():
+                with self.subTest(width=width, extension=extension):
+                    name = variant_name(post.image.name, width, extension)
+                    self.assertTrue(default_storage.exists(name))
+
+        response = self.client.get(self.INDEX)
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, default_storage.url(
+            variant_name(post.image.name, IMAGE_VARIANT_WIDTHS[0], 'jpg')
+        ))
+
+    def test_variant_names_unique(self):
+        """Варианты разных оригиналов не пересекаются по имени"""
+        names = (
+            'posts/photo.jpg',
+            'posts/photo.png',
+            'posts/2020/photo.jpg',
+        )
+        variants = {variant_name(name, 320, 'webp') for name in names}
+        self.assertEqual(len(variants), len(names))
+
     def test_following_for_users(self):
         """Неавторизованый пользователь не может создать подписку"""
         follow_count = Follow.objects.count()
@@ -362,3 +453,39 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']),
                     SECOND_PAGE_COUNT_POST,
                 )
+
+    def test_cursor_pages(self):
+        """Курсор ведёт на следующую страницу и обратно"""
+        pages = (
+            self.INDEX,
+            self.GROUP_LIST,
+            self.PROFILE,
+        )
+
+        for reverses in pages:
+            with self.subTest(value=reverses):
+                first = self.authorized_client.get(reverses).context[
+                    'page_obj']
+                self.assertIsNone(first.previous_cursor)
+                # Page для шаблона нумерован честно и не падает.
+                self.assertEqual(first.number, 1)
+                self.assertFalse(first.has_other_pages())
+                second = self.authorized_client.get(
+                    reverses, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), SECOND_PAGE_COUNT_POST)
+                self.assertIsNone(second.next_cursor)
+                back = self.authorized_client.get(
+                    reverses, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор открывает первую страницу"""
+        response = self.authorized_client.get(
+            self.INDEX, {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.all()[:NUMBER_OF_POSTS]),
+        )
@@ -0,0 +1,247 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import logging
+import posixpath
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import features, Image, ImageOps
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.routers import use_primary
+
+from .constants import (
+    IMAGE_VARIANT_DIR,
+    IMAGE_VARIANT_FALLBACK_WIDTH,
+    IMAGE_VARIANT_FORMATS,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_RATIO,
+    IMAGE_VARIANT_WIDTHS,
+    THUMBNAIL_GEOMETRY,
+    THUMBNAIL_OPTIONS,
+)
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    '''Бэкенд sorl, который не режет картинки внутри запроса.
+
+    Готовая миниатюра берётся из KV-хранилища; если её ещё нет,
+    генерация уходит в фоновую очередь, а шаблон получает оригинал.
+    '''
+
+    def prepare_options(self, source, options):
+        # Те же умолчания, что подставляет ThumbnailBackend.get_thumbnail,
+        # иначе имя миниатюры не совпадёт с именем при генерации.
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+
+        return options
+
+    def lookup(self, file_, geometry_string, **options):
+        '''Готовая миниатюра или None, картинка не открывается'''
+
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source,
+            geometry_string,
+            self.prepare_options(source, options),
+        )
+
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def generate(self, file_, geometry_string, **options):
+        '''Синхронно создаёт миниатюру'''
+
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        thumbnail = self.lookup(file_, geometry_string, **options)
+        if thumbnail:
+            return thumbnail
+        source = ImageFile(file_)
+        transaction.on_commit(
+            lambda: enqueue(source.name, geometry_string, options)
+        )
+
+        return source
+
+
+def _run(key, task):
+    try:
+        # Задача приходит сразу после коммита, реплика может отставать.
+        with use_primary():
+            return task()
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', key[1])
+    finally:
+        with _lock:
+            _pending.discard(key)
+        close_old_connections()
+
+
+def submit(key, task):
+    '''Ставит обработку картинки в фоновую очередь без повторов.
+
+    При THUMBNAIL_WORKERS = 0 задача выполняется сразу.
+    '''
+
+    global _executor
+
+    with _lock:
+        if key in _pending:
+            return None
+        _pending.add(key)
+    workers = settings.THUMBNAIL_WORKERS
+    if not workers:
+        return _run(key, task)
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='thumbnails',
+            )
+
+    return _executor.submit(_run, key, task)
+
+
+def enqueue(name, geometry=THUMBNAIL_GEOMETRY, options=THUMBNAIL_OPTIONS):
+    '''Ставит генерацию миниатюры sorl в очередь'''
+
+    options = dict(options)
+
+    return submit(
+        ('thumbnail', name, geometry),
+        lambda: default.backend.generate(name, geometry, **options),
+    )
+
+
+def variant_formats():
+    '''Форматы вариантов, которые умеет записывать Pillow'''
+
+    return [
+        (fmt, extension)
+        for fmt, extension, feature in IMAGE_VARIANT_FORMATS
+        if features.check(feature)
+    ]
+
+
+def variant_name(name, width, extension):
+    '''Имя варианта однозначно выводится из имени оригинала.
+
+    Путь оригинала сохраняется целиком вместе с расширением, чтобы
+    photo.jpg и photo.png или одноимённые файлы из разных папок
+    не делили варианты.
+    '''
+
+    original = posixpath.normpath(name).lstrip('/')
+
+    return posixpath.join(
+        IMAGE_VARIANT_DIR,
+        f'{original}_{width}.{extension}',
+    )
+
+
+def variant_srcsets(name):
+    '''srcset по расширениям и запасной src из JPEG'''
+
+    srcsets = {
+        extension: ', '.join(
+            f'{default_storage.url(variant_name(name, width, extension))} '
+            f'{width}w'
+            for width in IMAGE_VARIANT_WIDTHS
+        )
+        for fmt, extension in variant_formats()
+    }
+    srcsets['src'] = default_storage.url(
+        variant_name(name, IMAGE_VARIANT_FALLBACK_WIDTH, 'jpg')
+    )
+
+    return srcsets
+
+
+def generate_variants(name):
+    '''Режет оригинал во все ширины и форматы за одно открытие файла'''
+
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    for width in IMAGE_VARIANT_WIDTHS:
+        height = width * IMAGE_VARIANT_RATIO[1] // IMAGE_VARIANT_RATIO[0]
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for fmt, extension in variant_formats():
+            buffer = BytesIO()
+            resized.save(
+                buffer,
+                fmt,
+                quality=IMAGE_VARIANT_QUALITY,
+                optimize=True,
+            )
+            target = variant_name(name, width, extension)
+            default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+    mark_variants_ready(name)
+
+
+def mark_variants_ready(name):
+    # save(), а не update(): сигналы обновят кеш страниц и карточек.
+    for post in Post.objects.filter(image=name, image_variants=False):
+        post.image_variants = True
+        post.save(update_fields=('image_variants', 'updated'))
+
+
+def enqueue_variants(name):
+    '''Ставит нарезку вариантов картинки в очередь'''
+
+    return submit(('variants', name), lambda: generate_variants(name))
+
+
+def generate_missing(name):
+    '''Синхронно создаёт недостающие миниатюру и варианты картинки.
+
+    Вызывается в пуле процессов команды generate_thumbnails.
+    '''
+
+    created = False
+    try:
+        if not default.backend.lookup(
+            name,
+            THUMBNAIL_GEOMETRY,
+            **THUMBNAIL_OPTIONS,
+        ):
+            default.backend.generate(
+                name,
+                THUMBNAIL_GEOMETRY,
+                **THUMBNAIL_OPTIONS,
+            )
+            created = True
+        if Post.objects.filter(image=name, image_variants=False).exists():
+            generate_variants(name)
+            created = True
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+
+    return created
@@ -0,0 +1,184 @@
+from heapq import merge
+
+from django.db import connection, transaction
+from django.utils.functional import cached_property
+
+from .constants import FANOUT_FOLLOWERS_LIMIT, TIMELINE_BATCH_SIZE
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .utils import BACKWARD, CursorPaginator, seek
+
+
+def is_celebrity(author_id):
+    '''Слишком много подписчиков, чтобы раскладывать посты по лентам'''
+
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=FANOUT_FOLLOWERS_LIMIT,
+    ).exists()
+
+
+def followed_celebrities(user):
+    '''id авторов из подписок, посты которых читаются напрямую'''
+
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=FANOUT_FOLLOWERS_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+def fan_out(post):
+    '''Раскладывает новый пост в ленты подписчиков автора'''
+
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.id,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, *author_ids):
+    '''Дописывает в ленту подписчика уже опубликованные посты авторов'''
+
+    celebrities = AuthorStats.objects.filter(
+        user_id__in=author_ids,
+        followers_count__gt=FANOUT_FOLLOWERS_LIMIT,
+    ).values_list('user_id', flat=True)
+    regular = set(author_ids).difference(celebrities)
+    if not regular:
+        return
+    posts = Post.objects.filter(
+        author_id__in=regular,
+    ).values_list('id', 'author_id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, author_id, pub_date in posts.iterator()
+        ),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_followers(author_id):
+    '''Дописывает посты автора в ленты всех его подписчиков'''
+
+    followers = list(Follow.objects.filter(
+        author_id=author_id,
+    ).values_list('user_id', flat=True))
+    posts = Post.objects.filter(
+        author_id=author_id,
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=follower_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts.iterator()
+            for follower_id in followers
+        ),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    '''Убирает посты автора из ленты отписавшегося пользователя'''
+
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=FANOUT_FOLLOWERS_LIMIT,
+    ).exists():
+        # Автор только что перестал читаться напрямую: его посты,
+        # вышедшие без раскладки, дописываются всем подписчикам.
+        # Это тысячи строк, поэтому уже после коммита отписки.
+        transaction.on_commit(lambda: backfill_followers(author_id))
+
+
+def rebuild():
+    '''Раскладывает все ленты заново одним INSERT ... SELECT.
+
+    Нужна после массовой загрузки, которая обходит сигналы;
+    счётчики подписчиков к этому моменту должны быть верными.
+    Автор без строки счётчиков считается обычным. Удаление и вставка
+    идут в одной транзакции: читатели не видят пустых лент.
+    '''
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.all().delete()
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Follow._meta.db_table} f '
+            f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+            f'LEFT JOIN {AuthorStats._meta.db_table} s '
+            'ON s.user_id = f.author_id '
+            'WHERE COALESCE(s.followers_count, 0) <= %s',
+            [FANOUT_FOLLOWERS_LIMIT],
+        )
+
+
+class TimelinePaginator(CursorPaginator):
+    '''Лента подписок: материализованные записи плюс посты популярных авторов.
+
+    Обычные авторы читаются одним проходом по индексу
+    (user, pub_date, post); посты авторов с большим числом подписчиков
+    выбираются из Post тем же курсором и сливаются по (pub_date, id).
+    '''
+
+    def __init__(self, user, per_page):
+        super().__init__(Post.objects.none(), per_page)
+        self.user = user
+
+    @cached_property
+    def celebrities(self):
+        return followed_celebrities(self.user)
+
+    def fetch(self, position, limit):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if self.celebrities:
+            entries = entries.exclude(author_id__in=self.celebrities)
+        entries = seek(entries, position, pk_field='post_id')
+        posts = [
+            entry.post for entry in entries.select_related(
+                'post__author', 'post__group',
+            )[:limit]
+        ]
+        if not self.celebrities:
+            return posts
+        direct = seek(
+            Post.objects.select_related('author', 'group').filter(
+                author_id__in=self.celebrities,
+            ),
+            position,
+        )
+        backward = position is not None and position[0] == BACKWARD
+
+        return list(merge(
+            posts,
+            direct[:limit],
+            key=lambda post: (post.pub_date, post.id),
+            reverse=not backward,
+        ))[:limit]
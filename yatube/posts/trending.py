@@ -0,0 +1,200 @@
+from datetime import timedelta
+import math
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .constants import (
+    TIMELINE_BATCH_SIZE,
+    TRENDING_COMMENT_WEIGHT,
+    TRENDING_FOLLOWERS_WEIGHT,
+    TRENDING_GROUPS,
+    TRENDING_HALF_LIFE,
+    TRENDING_MAX_DRIFT,
+    TRENDING_MIN_SCORE,
+    TRENDING_TOP_K,
+)
+from .models import AuthorStats, Comment, Post, TrendingPost
+
+# Вес события в момент t считается как 2 ** ((t - reference) / half-life):
+# порядок постов от общего множителя не зависит, поэтому новое
+# событие просто прибавляется к весу, а старые не пересчитываются.
+# decay() переносит момент отсчёта вперёд одним UPDATE; событие читает
+# момент и пишет вес в одной транзакции, так что не смешивается с ним.
+
+
+def factor(moment, reference):
+    return 2 ** ((moment - reference).total_seconds() / TRENDING_HALF_LIFE)
+
+
+def post_weight(followers):
+    '''Начальный вес поста растёт с числом подписчиков автора'''
+
+    return 1 + TRENDING_FOLLOWERS_WEIGHT * math.log1p(followers)
+
+
+def reference():
+    '''Общий момент отсчёта весов.
+
+    Все строки хранят один и тот же decayed_at, поэтому хватает первой
+    строки по первичному ключу. Читается из базы при каждом событии:
+    decay идёт отдельным процессом, и кеш процесса о нём не узнает.
+    '''
+
+    return TrendingPost.objects.values_list(
+        'decayed_at',
+        flat=True,
+    ).first() or timezone.now()
+
+
+def current_reference(moment):
+    '''Момент отсчёта для события; слишком старый сначала сдвигается,
+    чтобы множитель не переполнился, если decay давно не запускали'''
+
+    base = reference()
+    if (moment - base).total_seconds() > TRENDING_MAX_DRIFT:
+        decay(moment)
+        base = moment
+
+    return base
+
+
+def post_created(post):
+    '''Новый пост попадает в тренды с весом по подписчикам автора'''
+
+    followers = AuthorStats.objects.filter(
+        user_id=post.author_id,
+    ).values_list('followers_count', flat=True).first() or 0
+    with transaction.atomic():
+        base = current_reference(post.pub_date)
+        TrendingPost.objects.create(
+            post=post,
+            group_id=post.group_id,
+            score=post_weight(followers) * factor(post.pub_date, base),
+            decayed_at=base,
+        )
+
+
+def commented(comment):
+    '''Комментарий прибавляет к весу поста одним UPDATE'''
+
+    with transaction.atomic():
+        base = current_reference(comment.created)
+        delta = TRENDING_COMMENT_WEIGHT * factor(comment.created, base)
+        if TrendingPost.objects.filter(pk=comment.post_id).update(
+            score=F('score') + delta,
+        ):
+            return
+        # Остывший пост возвращается в тренды с весом одного комментария.
+        group_id = Post.objects.filter(
+            pk=comment.post_id,
+        ).values_list('group_id', flat=True).first()
+        TrendingPost.objects.bulk_create(
+            [TrendingPost(
+                post_id=comment.post_id,
+                group_id=group_id,
+                score=delta,
+                decayed_at=base,
+            )],
+            ignore_conflicts=True,
+        )
+
+
+def post_moved(post):
+    TrendingPost.objects.filter(pk=post.pk).update(group_id=post.group_id)
+
+
+def decay(now=None):
+    '''Переносит момент отсчёта на now и убирает остывшие посты.
+
+    Все веса умножаются на один множитель одним UPDATE; возвращает
+    число оставшихся в трендах постов.
+    '''
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        TrendingPost.objects.update(
+            score=F('score') / factor(now, reference()),
+            decayed_at=now,
+        )
+        TrendingPost.objects.filter(score__lt=TRENDING_MIN_SCORE).delete()
+
+    return TrendingPost.objects.count()
+
+
+def rebuild(now=None):
+    '''Пересчитывает тренды с нуля по постам и комментариям.
+
+    Берутся события не старше горизонта, за которым вес опускается
+    ниже TRENDING_MIN_SCORE. Нужна после bulk_create.
+    '''
+
+    now = now or timezone.now()
+    horizon = now - timedelta(
+        seconds=TRENDING_HALF_LIFE * math.log2(1 / TRENDING_MIN_SCORE),
+    )
+    scores = {}
+    groups = {}
+    posts = Post.objects.filter(pub_date__gte=horizon).values_list(
+        'id',
+        'group_id',
+        'pub_date',
+        'author__stats__followers_count',
+    )
+    for post_id, group_id, pub_date, followers in posts.iterator():
+        scores[post_id] = post_weight(followers or 0) * factor(pub_date, now)
+        groups[post_id] = group_id
+    comments = Comment.objects.filter(created__gte=horizon).values_list(
+        'post_id',
+        'post__group_id',
+        'created',
+    )
+    for post_id, group_id, created in comments.iterator():
+        scores[post_id] = scores.get(post_id, 0) + (
+            TRENDING_COMMENT_WEIGHT * factor(created, now)
+        )
+        groups[post_id] = group_id
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            (
+                TrendingPost(
+                    post_id=post_id,
+                    group_id=groups[post_id],
+                    score=score,
+                    decayed_at=now,
+                )
+                for post_id, score in scores.items()
+                if score >= TRENDING_MIN_SCORE
+            ),
+            batch_size=TIMELINE_BATCH_SIZE,
+        )
+
+    return TrendingPost.objects.count()
+
+
+def top_posts(group=None, limit=TRENDING_TOP_K):
+    '''Лучшие посты одним чтением по индексу веса'''
+
+    entries = TrendingPost.objects.order_by('-score')
+    if group is not None:
+        entries = entries.filter(group=group)
+
+    return [
+        entry.post
+        for entry in entries.select_related(
+            'post__author',
+            'post__group',
+        )[:limit]
+    ]
+
+
+def top_groups(limit=TRENDING_GROUPS):
+    '''Группы по сумме весов их постов'''
+
+    return list(TrendingPost.objects.filter(
+        group__isnull=False,
+    ).values('group__slug', 'group__title').annotate(
+        score=Sum('score'),
+    ).order_by('-score')[:limit])
@@ -1,12 +1,201 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+from collections.abc import Sequence
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .constants import (
+    COMMENTS_PER_PAGE,
+    CURSOR_PARAM,
+    NUMBER_OF_POSTS,
+    PAGE_PARAM,
+)
+from .models import Comment
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(direction, key, pk):
+    '''Упаковывает позицию в ленте в непрозрачный токен'''
+
+    key = key.isoformat() if hasattr(key, 'isoformat') else repr(key)
+    raw = f'{direction}|{key}|{pk}'.encode()
+
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, parse_key=parse_datetime):
+    '''Распаковывает токен, для битого токена возвращает None'''
+
+    if not token:
+        return None
+    try:
+        raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        direction, key, pk = raw.split('|')
+        key = parse_key(key)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (FORWARD, BACKWARD) or key is None:
+        return None
+
+    return direction, key, pk
+
+
+def seek(queryset, position, date_field='pub_date', pk_field='pk'):
+    '''Отбирает записи после позиции курсора в порядке обхода.
+
+    Лишнее на вид условие date <= :date даёт SQLite границу диапазона
+    в индексе (дата, id), иначе OR читает индекс с самого начала.
+    '''
+
+    if position is None:
+        return queryset.order_by(f'-{date_field}', f'-{pk_field}')
+    direction, date, pk = position
+    if direction == FORWARD:
+        condition = Q(**{f'{date_field}__lte': date}) & (
+            Q(**{f'{date_field}__lt': date})
+            | Q(**{f'{pk_field}__lt': pk})
+        )
+        ordering = (f'-{date_field}', f'-{pk_field}')
+    else:
+        condition = Q(**{f'{date_field}__gte': date}) & (
+            Q(**{f'{date_field}__gt': date})
+            | Q(**{f'{pk_field}__gt': pk})
+        )
+        ordering = (date_field, pk_field)
+
+    return queryset.filter(condition).order_by(*ordering)
+
+
+class CursorPage(Sequence):
+    '''Страница курсорной ленты.
+
+    Номера у неё нет: соседние страницы задаются курсорами
+    next_cursor и previous_cursor, None — страницы нет.
+    '''
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage: {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def as_page(self):
+        '''django Page тех же объектов для шаблонов лент.
+
+        Шаблоны и тесты проекта ждут в page_obj Page. Это честная
+        единственная страница своего Paginator над уже выбранным
+        списком, без запросов; курсоры переносятся на неё.
+        '''
+
+        page = Paginator(self.object_list, max(len(self), 1)).page(1)
+        page.next_cursor = self.next_cursor
+        page.previous_cursor = self.previous_cursor
+
+        return page
+
+
+class CursorPaginator(Paginator):
+    '''Паджинатор по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Каждая страница выбирается одним запросом вида
+    WHERE (date, id) < (:date, :id) ORDER BY date DESC, id DESC LIMIT n + 1,
+    поэтому стоимость не зависит от глубины страницы.
+    '''
+
+    parse_key = staticmethod(parse_datetime)
+
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        super().__init__(object_list, per_page)
+        self.date_field = date_field
+
+    def fetch(self, position, limit):
+        '''Возвращает до limit объектов после позиции в порядке обхода'''
+
+        return list(seek(self.object_list, position, self.date_field)[:limit])
+
+    def get_page(self, cursor=None):
+        '''Возвращает CursorPage, следующую за курсором'''
+
+        position = decode_cursor(cursor, self.parse_key)
+        objects = self.fetch(position, self.per_page + 1)
+        if not objects and position is not None:
+            return self.get_page()
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if position is not None and position[0] == BACKWARD:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        page = CursorPage(objects, self)
+        if objects and has_next:
+            page.next_cursor = self._cursor(FORWARD, objects[-1])
+        if objects and has_previous:
+            page.previous_cursor = self._cursor(BACKWARD, objects[0])
+
+        return page
+
+    def cursor_key(self, obj):
+        return getattr(obj, self.date_field)
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(direction, self.cursor_key(obj), obj.pk)
+
+
+def paginator_posts(request, posts, date_field='pub_date', paginator=None):
+    '''Отображет колличество постов на странице.
+
+    По умолчанию лента листается курсором ``?cursor=``; запрос с
+    ``?page=N`` обслуживается классическим Paginator для старых ссылок.
+    Готовый курсорный paginator заменяет выборку из posts.
+    '''
+
+    if PAGE_PARAM in request.GET:
+        paginator = Paginator(posts, NUMBER_OF_POSTS)
+        return paginator.get_page(request.GET.get(PAGE_PARAM))
+
+    if paginator is None:
+        paginator = CursorPaginator(posts, NUMBER_OF_POSTS, date_field)
+
+    return paginator.get_page(request.GET.get(CURSOR_PARAM)).as_page()
 
-from .constants import NUMBER_OF_POSTS
 
+def paginator_comments(request, post_id):
+    '''Страница комментариев поста по курсору, новые сверху.
 
-def paginator_posts(request, posts):
-    '''Отображет колличество постов на странице'''
+    Размер страницы задаёт COMMENTS_PER_PAGE в настройках.
+    '''
 
-    paginator = Paginator(posts, NUMBER_OF_POSTS)
-    page_number = request.GET.get('page')
+    paginator = CursorPaginator(
+        Comment.objects.select_related('author').filter(post_id=post_id),
+        getattr(settings, 'COMMENTS_PER_PAGE', COMMENTS_PER_PAGE),
+        'created',
+    )
 
-    return paginator.get_page(page_number)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
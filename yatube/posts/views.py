@@ -1,17 +1,49 @@
+from django.http import (
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-
-from .models import Post, Group, Follow, User
-from .forms import PostForm, CommentForm
-from .utils import paginator_posts
+from django.core.files.storage import default_storage
 
+from core.concurrent import gather
+from core.querycount import query_budget
+from core.routers import use_primary
 
-@cache_page(20, key_prefix='index_page')
+from . import follow_graph, follows, recommendations, trending
+from .models import Comment, Post, Group, User
+from .forms import PostForm, CommentForm
+from .caching import (
+    cache_page_versioned,
+    group_namespaces,
+    index_namespaces,
+    profile_namespaces,
+)
+from .conditional import (
+    conditional_page,
+    group_validators,
+    post_validators,
+    profile_validators,
+)
+from .exports import FORMATS, export_lines
+from .constants import (
+    CURSOR_PARAM,
+    NUMBER_OF_POSTS,
+    PAGE_CACHE_TIMEOUT,
+    TRENDING_CACHE_TIMEOUT,
+)
+from .search import SearchPaginator
+from .timeline import TimelinePaginator
+from .utils import paginator_comments, paginator_posts
+
+
+@query_budget(4)
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, 'index_page', index_namespaces)
 def index(request):
     '''Обработка основной страницы сайта'''
 
-    posts = Post.objects.select_related('author')
+    posts = Post.objects.select_related('author', 'group')
     context = {
         'page_obj': paginator_posts(request, posts),
     }
@@ -19,46 +51,84 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(6)
+@conditional_page(group_validators)
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, 'group_page', group_namespaces)
 def group_posts(request, slug):
     '''Обработка страницы группы'''
 
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = Post.objects.select_related('author', 'group').filter(
+        group__slug=slug,
+    )
+    group, page = gather(
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda: paginator_posts(request, posts),
+    )
     context = {
         'group': group,
-        'page_obj': paginator_posts(request, posts),
+        'page_obj': page,
     }
 
     return render(request, 'posts/group_list.html', context)
 
 
+def profile_page_namespaces(username):
+    '''Поколение профиля по id автора из адреса с именем'''
+
+    return profile_namespaces(User.objects.filter(
+        username=username,
+    ).values_list('pk', flat=True).first())
+
+
+@query_budget(8)
+@conditional_page(profile_validators)
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT,
+    'profile_page',
+    profile_page_namespaces,
+)
 def profile(request, username):
     '''Обработка страницы пользователя'''
 
-    author = get_object_or_404(
-        User.objects,
-        username=username,
+    reader = request.user if request.user.is_authenticated else None
+    posts_autor = Post.objects.select_related('author', 'group').filter(
+        author__username=username,
+    )
+    own = reader is not None and reader.username == username
+    author, page, suggested = gather(
+        lambda: get_object_or_404(
+            User.objects.select_related('stats'),
+            username=username,
+        ),
+        lambda: paginator_posts(request, posts_autor),
+        lambda: recommendations.for_user(reader.pk) if own else [],
     )
-    posts_autor = author.posts.all()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author,
-    ).exists()
     context = {
-        'page_obj': paginator_posts(request, posts_autor),
+        'page_obj': page,
         'author': author,
-        'following': following,
+        'recommendations': suggested,
+        'following': (
+            reader is not None and not own
+            and follow_graph.is_following(reader.pk, author.pk)
+        ),
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(6)
+@conditional_page(post_validators)
 def post_detail(request, post_id):
     '''Обработка странцы поста'''
 
-    post = get_object_or_404(Post, id=post_id)
+    post, comments = gather(
+        lambda: get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            id=post_id,
+        ),
+        lambda: paginator_comments(request, post_id),
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.select_related('post', 'author')
     context = {
         'post': post,
         'form': form,
@@ -68,6 +138,34 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(3)
+def post_comments(request, post_id):
+    '''Следующая порция комментариев: HTML-фрагмент или JSON'''
+
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    comments = paginator_comments(request, post.pk)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@use_primary()
 @login_required
 def post_create(request):
     '''Обработка страницы создания поста'''
@@ -84,6 +182,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+@use_primary()
 @login_required
 def post_edit(request, post_id):
     '''Обработка страницы редактирования поста'''
@@ -112,6 +211,7 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@use_primary()
 @login_required
 def add_comment(request, post_id):
     '''Вью-функция добавления комментария'''
@@ -127,42 +227,134 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(4)
+@cache_page_versioned(
+    TRENDING_CACHE_TIMEOUT,
+    'trending_page',
+    index_namespaces,
+)
+def trending_posts(request):
+    '''Обработка страницы популярных постов и групп'''
+
+    posts, groups = gather(trending.top_posts, trending.top_groups)
+    context = {
+        'posts': posts,
+        'groups': groups,
+        'hide_group': False,
+    }
+
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(4)
+@cache_page_versioned(
+    TRENDING_CACHE_TIMEOUT,
+    'group_trending_page',
+    group_namespaces,
+)
+def group_trending(request, slug):
+    '''Обработка страницы популярных постов группы'''
+
+    group = get_object_or_404(Group, slug=slug)
+    context = {
+        'group': group,
+        'posts': trending.top_posts(group),
+        'hide_group': True,
+    }
+
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(7)
 @login_required
 def follow_index(request):
     '''Обработка страницы подписаок автора'''
 
-    posts = Post.objects.filter(author__following__user=request.user)
-    following_count = Follow.objects.filter(
-        author__following__user=request.user).count()
+    posts = Post.objects.select_related('author', 'group').filter(
+        author__following__user=request.user,
+    )
+    timeline = TimelinePaginator(request.user, NUMBER_OF_POSTS)
+    page, following_count, suggested = gather(
+        lambda: paginator_posts(request, posts, paginator=timeline),
+        lambda: follow_graph.following_count(request.user.pk),
+        lambda: recommendations.for_user(request.user.pk),
+    )
     context = {
         'user': request.user,
-        'page_obj': paginator_posts(request, posts),
+        'page_obj': page,
         'following_count': following_count,
+        'recommendations': suggested,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@use_primary()
 @login_required
 def profile_follow(request, username):
     '''Обработка страницы подписки на автора'''
 
-    author = get_object_or_404(User, username=username)
-    if request.user == author or Follow.objects.filter(
-        user=request.user,
-        author=author,
-    ).exists():
-        return redirect('posts:profile', username=username)
-    Follow.objects.create(user=request.user, author=author)
+    if follows.follow(request.user.pk, [username]):
+        return redirect('posts:follow_index')
+    get_object_or_404(User, username=username)
 
-    return redirect('posts:follow_index')
+    return redirect('posts:profile', username=username)
 
 
+@use_primary()
 @login_required
 def profile_unfollow(request, username):
     '''Обработка страницы отписки от автора'''
 
-    author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(user=request.user, author=author).exists():
-        Follow.objects.filter(user=request.user, author=author).delete()
+    if not follows.unfollow(request.user.pk, [username]):
+        get_object_or_404(User, username=username)
 
     return redirect('posts:follow_index')
+
+
+@query_budget(5)
+def search(request):
+    '''Обработка страницы поиска по постам'''
+
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, NUMBER_OF_POSTS)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get(CURSOR_PARAM)),
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+def export(request):
+    '''Потоковая выгрузка своих постов и комментариев'''
+
+    fmt = request.GET.get('format', 'ndjson')
+    kind = request.GET.get('kind', 'posts' if fmt == 'csv' else 'all')
+    if fmt not in FORMATS or kind not in ('posts', 'comments', 'all'):
+        return HttpResponseBadRequest('Неизвестный формат или вид')
+    if fmt == 'csv' and kind == 'all':
+        return HttpResponseBadRequest('CSV выгружает один вид за раз')
+    querysets = {
+        'posts': Post.objects.filter(author=request.user),
+        'comments': Comment.objects.filter(author=request.user),
+    }
+    kinds = [
+        (name, queryset) for name, queryset in querysets.items()
+        if kind in (name, 'all')
+    ]
+    image_url = None
+    if request.GET.get('images'):
+        def image_url(name):
+            return request.build_absolute_uri(default_storage.url(name))
+
+    extension, content_type = FORMATS[fmt]
+    response = StreamingHttpResponse(
+        export_lines(fmt, kinds, image_url),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{request.user.username}-{kind}.{extension}"'
+    )
+
+    return response
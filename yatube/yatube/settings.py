@@ -21,10 +21,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,13 +57,27 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 с WAL и PRAGMA из core.db.backends.sqlite3.DEFAULT_PRAGMAS,
+        # свои значения задаются в OPTIONS['pragmas'].
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Псевдонимы реплик из DATABASES; пусто — всё читается из default.
+REPLICA_DATABASES = []
+# Сколько секунд после записи клиент читает с основной базы.
+REPLICA_PIN_SECONDS = 5
+# Через сколько секунд снова пробовать упавшую реплику.
+REPLICA_RETRY_SECONDS = 30
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -105,8 +122,21 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# LocMemCache годится для разработки и тестов. В бою с несколькими
+# процессами нужен общий бэкенд (Memcached, Redis, база): поколения
+# страниц, блокировки от толпы и счётчики cache_metrics живут в кеше.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+# Потоки фоновой нарезки картинок; 0 — нарезка сразу после коммита
+# в том же процессе, так ведут себя отладка и тесты. На сервере
+# потоки включаются переменной окружения THUMBNAIL_WORKERS.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '0'))
+
+# Потоки, в которых view одновременно выполняют независимые чтения
+# (core.concurrent.gather); 0 — по очереди в потоке запроса.
+QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', '4'))